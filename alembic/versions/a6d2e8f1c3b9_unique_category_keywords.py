@@ -0,0 +1,57 @@
+"""unique keyword per user category
+
+Revision ID: a6d2e8f1c3b9
+Revises: f3c8a1d5e7b2
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.core.types import GUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6d2e8f1c3b9'
+down_revision: Union[str, None] = 'f3c8a1d5e7b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Drop duplicates left by older seeding runs, keeping the oldest row of each group
+    keywords = sa.table(
+        'category_keywords',
+        sa.column('id', GUID()),
+        sa.column('user_id', GUID()),
+        sa.column('category_id', GUID()),
+        sa.column('keyword', sa.String()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(keywords.c.id, keywords.c.user_id, keywords.c.category_id, keywords.c.keyword)
+        .order_by(keywords.c.created_at)
+    ).fetchall()
+    seen = set()
+    duplicate_ids = []
+    for keyword_id, user_id, category_id, keyword in rows:
+        key = (user_id, category_id, keyword)
+        if key in seen:
+            duplicate_ids.append(keyword_id)
+        else:
+            seen.add(key)
+    if duplicate_ids:
+        bind.execute(keywords.delete().where(keywords.c.id.in_(duplicate_ids)))
+
+    op.create_index(
+        'uq_category_keywords_user_category_keyword',
+        'category_keywords',
+        ['user_id', 'category_id', 'keyword'],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_category_keywords_user_category_keyword', table_name='category_keywords')
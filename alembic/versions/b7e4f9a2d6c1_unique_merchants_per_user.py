@@ -0,0 +1,71 @@
+"""unique merchant canonical name per user
+
+Revision ID: b7e4f9a2d6c1
+Revises: a6d2e8f1c3b9
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.core.types import GUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e4f9a2d6c1'
+down_revision: Union[str, None] = 'a6d2e8f1c3b9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Merge case-insensitive duplicates into the oldest row, summing their transaction counts
+    merchants = sa.table(
+        'merchants',
+        sa.column('id', GUID()),
+        sa.column('user_id', GUID()),
+        sa.column('canonical_name', sa.String()),
+        sa.column('transaction_count', sa.String()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(merchants.c.id, merchants.c.user_id, merchants.c.canonical_name, merchants.c.transaction_count)
+        .order_by(merchants.c.created_at)
+    ).fetchall()
+    keepers = {}
+    totals = {}
+    duplicate_ids = []
+    merged_keys = set()
+    for merchant_id, user_id, canonical_name, transaction_count in rows:
+        key = (user_id, canonical_name.lower())
+        try:
+            count = int(transaction_count or "0")
+        except ValueError:
+            count = 0
+        if key in keepers:
+            duplicate_ids.append(merchant_id)
+            merged_keys.add(key)
+        else:
+            keepers[key] = merchant_id
+        totals[key] = totals.get(key, 0) + count
+    if duplicate_ids:
+        bind.execute(merchants.delete().where(merchants.c.id.in_(duplicate_ids)))
+        for key in merged_keys:
+            bind.execute(
+                merchants.update()
+                .where(merchants.c.id == keepers[key])
+                .values(transaction_count=str(totals[key]))
+            )
+
+    op.create_index(
+        'uq_merchants_user_id_lower_canonical_name',
+        'merchants',
+        ['user_id', sa.text('lower(canonical_name)')],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_merchants_user_id_lower_canonical_name', table_name='merchants')
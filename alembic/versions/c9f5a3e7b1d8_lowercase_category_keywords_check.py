@@ -0,0 +1,63 @@
+"""lowercase category keywords check
+
+Revision ID: c9f5a3e7b1d8
+Revises: b7e4f9a2d6c1
+Create Date: 2026-10-17 23:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from app.core.types import GUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9f5a3e7b1d8'
+down_revision: Union[str, None] = 'b7e4f9a2d6c1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Normalize keywords written before lowercasing was enforced, dropping rows that would
+    # collide with an older row once lowercased
+    keywords = sa.table(
+        'category_keywords',
+        sa.column('id', GUID()),
+        sa.column('user_id', GUID()),
+        sa.column('category_id', GUID()),
+        sa.column('keyword', sa.String()),
+        sa.column('created_at', sa.DateTime(timezone=True)),
+    )
+    bind = op.get_bind()
+    rows = bind.execute(
+        sa.select(keywords.c.id, keywords.c.user_id, keywords.c.category_id, keywords.c.keyword)
+        .order_by(keywords.c.created_at)
+    ).fetchall()
+    seen = set()
+    duplicate_ids = []
+    for keyword_id, user_id, category_id, keyword in rows:
+        key = (user_id, category_id, keyword.lower().strip())
+        if key in seen:
+            duplicate_ids.append(keyword_id)
+        else:
+            seen.add(key)
+    if duplicate_ids:
+        bind.execute(keywords.delete().where(keywords.c.id.in_(duplicate_ids)))
+    normalized = sa.func.lower(sa.func.trim(keywords.c.keyword))
+    bind.execute(
+        keywords.update()
+        .where(keywords.c.keyword != normalized)
+        .values(keyword=normalized)
+    )
+
+    op.create_check_constraint(
+        'ck_category_keywords_keyword_lowercase',
+        'category_keywords',
+        'keyword = lower(keyword)',
+    )
+
+
+def downgrade() -> None:
+    op.drop_constraint('ck_category_keywords_keyword_lowercase', 'category_keywords', type_='check')
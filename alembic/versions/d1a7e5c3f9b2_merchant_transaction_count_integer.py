@@ -0,0 +1,46 @@
+"""merchant transaction_count as integer
+
+Revision ID: d1a7e5c3f9b2
+Revises: c9f5a3e7b1d8
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd1a7e5c3f9b2'
+down_revision: Union[str, None] = 'c9f5a3e7b1d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Counts were stored as text; anything that is not a plain number becomes 0
+    op.alter_column(
+        'merchants',
+        'transaction_count',
+        existing_type=sa.String(),
+        type_=sa.Integer(),
+        nullable=False,
+        server_default='0',
+        postgresql_using=(
+            "CASE WHEN transaction_count ~ '^[0-9]+$' "
+            "THEN transaction_count::integer ELSE 0 END"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.alter_column(
+        'merchants',
+        'transaction_count',
+        existing_type=sa.Integer(),
+        type_=sa.String(),
+        nullable=True,
+        server_default=None,
+        postgresql_using='transaction_count::text',
+    )
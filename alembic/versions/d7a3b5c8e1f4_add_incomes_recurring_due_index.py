@@ -0,0 +1,32 @@
+"""add partial recurring due index to incomes
+
+Revision ID: d7a3b5c8e1f4
+Revises: b532080f22d3
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd7a3b5c8e1f4'
+down_revision: Union[str, None] = 'b532080f22d3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_incomes_recurring_due',
+        'incomes',
+        ['recurring_day', 'last_processed_date'],
+        unique=False,
+        postgresql_where=sa.text('is_recurring'),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_incomes_recurring_due', table_name='incomes')
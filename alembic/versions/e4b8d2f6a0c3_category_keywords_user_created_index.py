@@ -0,0 +1,29 @@
+"""category keywords (user_id, created_at) index
+
+Revision ID: e4b8d2f6a0c3
+Revises: d1a7e5c3f9b2
+Create Date: 2026-10-18 01:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4b8d2f6a0c3'
+down_revision: Union[str, None] = 'd1a7e5c3f9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(
+        'ix_category_keywords_user_id_created_at',
+        'category_keywords',
+        ['user_id', 'created_at'],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_category_keywords_user_id_created_at', table_name='category_keywords')
@@ -0,0 +1,46 @@
+"""store statements.processed_transactions as jsonb
+
+Revision ID: f3c8a1d5e7b2
+Revises: d7a3b5c8e1f4
+Create Date: 2026-10-17 17:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c8a1d5e7b2'
+down_revision: Union[str, None] = 'd7a3b5c8e1f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Other backends keep storing JSON as text, which is what sa.JSON maps to
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'statements',
+        'processed_transactions',
+        existing_type=sa.Text(),
+        type_=postgresql.JSONB(),
+        postgresql_using='processed_transactions::jsonb',
+        existing_nullable=True,
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.alter_column(
+        'statements',
+        'processed_transactions',
+        existing_type=postgresql.JSONB(),
+        type_=sa.Text(),
+        postgresql_using='processed_transactions::text',
+        existing_nullable=True,
+    )
@@ -65,7 +65,7 @@ async def process_statement_background_async(
 
     try:
         # Get statement from database
-        statement = db.query(Statement).filter(Statement.id == statement_id).first()
+        statement = db.get(Statement, uuid.UUID(statement_id))
         if not statement:
             logger.error(f"❌ Statement {statement_id} not found in database")
             return
@@ -78,10 +78,9 @@ async def process_statement_background_async(
         db.commit()
 
         # Get card for bank type
-        card = db.query(Card).filter(
-            Card.id == card_id,
-            Card.user_id == user_id
-        ).first()
+        card = db.get(Card, uuid.UUID(str(card_id)))
+        if card and card.user_id != user_id:
+            card = None
 
         if not card:
             statement.status = "failed"
@@ -127,7 +126,7 @@ async def process_statement_background_async(
 
         # Update statement with error status
         try:
-            statement = db.query(Statement).filter(Statement.id == statement_id).first()
+            statement = db.get(Statement, uuid.UUID(statement_id))
             if statement:
                 statement.status = "failed"
                 statement.extraction_status = "failed"
@@ -502,19 +501,11 @@ async def process_statement(
             statement_id=statement.id,
             file_content=file_content,
             password=None,  # Can be enhanced later to support passwords
-            use_keyword_categorization=True
+            use_keyword_categorization=True,
+            # Passed explicitly: the card_id commit above may have been rolled back
+            card_id=card.id
         )
 
-        # Update card association for all created transactions
-        created_transactions = db.query(Transaction).filter(
-            Transaction.statement_id == statement.id
-        ).all()
-
-        for transaction in created_transactions:
-            transaction.card_id = card.id
-
-        db.commit()
-
         # Return success response
         return StatementProcess(
             statement_id=statement.id,
@@ -719,21 +710,10 @@ async def upload_statement_simple(
             statement_id=statement.id,
             file_content=file_content,
             password=None,  # Password already used to unlock content above
-            use_keyword_categorization=True
+            use_keyword_categorization=True,
+            card_id=card.id
         )
 
-        # Update card association for all created transactions
-        # The UniversalStatementService creates transactions without card_id
-        # We need to update them to associate with the selected card
-        created_transactions = db.query(Transaction).filter(
-            Transaction.statement_id == statement.id
-        ).all()
-
-        for transaction in created_transactions:
-            transaction.card_id = card.id
-
-        db.commit()
-
         # Return proper JSON response
         return {
             "id": str(statement.id),
@@ -847,7 +827,7 @@ async def simple_extract_transactions(
     """AI-powered extraction endpoint (unified approach)"""
     try:
         # Get statement using simple query
-        statement_query = db.query(Statement).filter(Statement.id == statement_id).first()
+        statement_query = db.get(Statement, statement_id)
         if not statement_query:
             raise HTTPException(status_code=404, detail="Statement not found")
 
@@ -946,8 +926,14 @@ async def recategorize_statement_transactions(
         )
 
     try:
-        # Get all transactions for this statement
-        transactions = db.query(Transaction).filter(
+        # Get the columns categorization reads for this statement's transactions
+        transactions = db.query(
+            Transaction.id,
+            Transaction.merchant,
+            Transaction.description,
+            Transaction.category,
+            Transaction.ai_confidence
+        ).filter(
             Transaction.statement_id == statement_id
         ).all()
 
@@ -970,27 +956,36 @@ async def recategorize_statement_transactions(
         keyword_categorized = 0
         uncategorized = 0
 
-        # Apply keyword categorization to each transaction
-        for transaction in transactions:
-            # Try keyword categorization
-            keyword_result = categorization_service.categorize_transaction(
-                str(current_user.id),
-                transaction.merchant,
-                transaction.description or ""
-            )
-
+        # Apply keyword categorization to each transaction, loading the user's keywords once
+        keyword_results = categorization_service.categorize_many(
+            str(current_user.id),
+            [(transaction.merchant, transaction.description or "") for transaction in transactions]
+        )
+        updates = []
+        for transaction, keyword_result in zip(transactions, keyword_results):
             if keyword_result and keyword_result.confidence > 0.0:
                 # Apply keyword category
-                transaction.category = keyword_result.category_name
-                transaction.ai_confidence = keyword_result.confidence
+                category = keyword_result.category_name
+                confidence = keyword_result.confidence
                 keyword_categorized += 1
-                logger.info(f"Recategorized: {transaction.merchant} -> {keyword_result.category_name} (confidence: {keyword_result.confidence:.2f})")
+                logger.info(f"Recategorized: {transaction.merchant} -> {category} (confidence: {confidence:.2f})")
             else:
                 # Set to default category if no keyword match
-                transaction.category = "Sin categoría"
-                transaction.ai_confidence = 0.0
+                category = "Sin categoría"
+                confidence = 0.0
                 uncategorized += 1
 
+            # Only rows whose category or stored (2-decimal) confidence actually change are written
+            if (
+                category != transaction.category
+                or transaction.ai_confidence is None
+                or round(float(transaction.ai_confidence), 2) != round(confidence, 2)
+            ):
+                updates.append({"id": transaction.id, "category": category, "ai_confidence": confidence})
+
+        if updates:
+            db.bulk_update_mappings(Transaction, updates)
+
         # Update statement categorization status
         statement.categorization_status = "completed"
 
@@ -1,13 +1,36 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
 
+try:
+    import orjson
+except ImportError:  # JSON columns fall back to the stdlib encoder
+    orjson = None
+
+
+def _json_serializer(value) -> str:
+    return orjson.dumps(value).decode("utf-8")
+
+
+_engine_options = {}
+if orjson is not None:
+    _engine_options["json_serializer"] = _json_serializer
+
+_url = make_url(settings.DATABASE_URL)
+if _url.get_backend_name() == "postgresql" and _url.get_driver_name() == "psycopg2":
+    # With insertmanyvalues off, executemany INSERT/UPDATE/DELETE (bulk mappings, keyword
+    # seeding) would otherwise run one statement per row; psycopg2's execute_batch pages them
+    _engine_options["executemany_mode"] = "values_plus_batch"
+    _engine_options["executemany_batch_page_size"] = 500
+
 # Single database engine (Postgres or any SQLAlchemy-supported URL provided via env)
 engine = create_engine(
     settings.DATABASE_URL,
     pool_pre_ping=True,
     use_insertmanyvalues=False,  # Avoid UUID sentinel mismatch with RETURNING
+    **_engine_options,
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Index, CheckConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.core.database import Base
@@ -7,6 +7,14 @@ import uuid
 
 class CategoryKeyword(Base):
     __tablename__ = "category_keywords"
+    __table_args__ = (
+        # One row per keyword per user category; also serves the duplicate checks on insert
+        Index("uq_category_keywords_user_category_keyword", "user_id", "category_id", "keyword", unique=True),
+        # Per-user keyword listings and index builds read in creation order
+        Index("ix_category_keywords_user_id_created_at", "user_id", "created_at"),
+        # Keywords are lowercased on write so lookups compare the stored value directly
+        CheckConstraint("keyword = lower(keyword)", name="ck_category_keywords_keyword_lowercase"),
+    )
     
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, Date, ForeignKey, Numeric, Boolean, Integer
+from sqlalchemy import Column, String, DateTime, Date, ForeignKey, Numeric, Boolean, Integer, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -8,6 +8,15 @@ from app.core.types import GUID
 
 class Income(Base):
     __tablename__ = "incomes"
+    __table_args__ = (
+        # Partial index: only recurring incomes are ever scanned by the daily run
+        Index(
+            "ix_incomes_recurring_due",
+            "recurring_day",
+            "last_processed_date",
+            postgresql_where=text("is_recurring"),
+        ),
+    )
 
     id = Column(GUID(), primary_key=True, default=uuid.uuid4)
     user_id = Column(GUID(), ForeignKey("users.id"), nullable=False)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -15,7 +15,7 @@ class Merchant(Base):
     display_name = Column(String, nullable=False)    # Display name (can be same as canonical)
     description_patterns = Column(String)  # JSON array of patterns that match this merchant
     category = Column(String)  # Most common category for this merchant
-    transaction_count = Column(String, default="0")  # Number of transactions with this merchant
+    transaction_count = Column(Integer, nullable=False, default=0, server_default="0")  # Number of transactions with this merchant
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
@@ -23,4 +23,13 @@ class Merchant(Base):
     user = relationship("User", back_populates="merchants")
 
     def __repr__(self):
-        return f"<Merchant {self.canonical_name} (User: {self.user_id})>"
\ No newline at end of file
+        return f"<Merchant {self.canonical_name} (User: {self.user_id})>"
+
+
+# One merchant per user and case-insensitive canonical name; the merchant upsert conflicts on it
+Index(
+    "uq_merchants_user_id_lower_canonical_name",
+    Merchant.user_id,
+    func.lower(Merchant.canonical_name),
+    unique=True,
+)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Date, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, Boolean, Date, Integer, JSON
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 import uuid
@@ -30,7 +31,7 @@ class Statement(Base):
     categorization_retries = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
 
-    processed_transactions = Column(Text)  # JSON string of parsed transactions
+    processed_transactions = Column(JSON().with_variant(JSONB(), "postgresql"))  # List of parsed transaction summaries
     ai_insights = Column(Text)  # JSON string of AI-generated insights and tips
     error_message = Column(Text)  # Store error details for failed operations
     is_processed = Column(Boolean, default=False)
@@ -375,17 +375,13 @@ class AIService:
     async def extract_text_from_pdf(self, file_content: bytes) -> str:
         """Extract text from PDF file content"""
         try:
-            import PyPDF2
-            import io
+            # pypdfium2 first, with the PyMuPDF/pdfplumber/PyPDF2 fallbacks behind it
+            from app.services.pdf_service import PDFService
             
-            pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-            text = ""
+            success, text, error = PDFService.extract_text_from_pdf(file_content)
             
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-            
-            if not text.strip():
-                raise ValueError("No text could be extracted from PDF")
+            if not success or not text or not text.strip():
+                raise ValueError(error or "No text could be extracted from PDF")
             
             return text.strip()
             
@@ -412,10 +408,10 @@ class AIService:
                     return json.loads(content)
                 except json.JSONDecodeError:
                     # Try to extract JSON from response if there's extra text
-                    import re
-                    json_match = re.search(r'\[.*\]', content, re.DOTALL)
-                    if json_match:
-                        return json.loads(json_match.group())
+                    json_start = content.find('[')
+                    json_end = content.rfind(']') + 1
+                    if json_start >= 0 and json_end > json_start:
+                        return json.loads(content[json_start:json_end])
                     else:
                         raise ValueError("Could not extract valid JSON from response")
             else:
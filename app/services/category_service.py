@@ -1,12 +1,15 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional, Dict, Any
+import re
 import uuid
 
 from app.models.category import Category
 from app.models.transaction import Transaction
+from app.models.card import Card
 from app.schemas.category import CategoryCreate, CategoryUpdate, CategoryKeywordMatch
 from app.core.exceptions import NotFoundError, ValidationError
+from app.services.keyword_service import invalidate_keyword_index
 
 # Restricted category names that cannot be created by users
 RESTRICTED_CATEGORY_NAMES = {"income", "ingreso"}
@@ -64,6 +67,20 @@ EMOJI_MAPPINGS = {
     "default": "📋",
 }
 
+# Keyword fallbacks, one precompiled alternation per emoji, checked in order
+_EMOJI_FALLBACK_PATTERNS = tuple(
+    (re.compile("|".join(map(re.escape, words))), emoji)
+    for words, emoji in (
+        (("comida", "alimento", "restaurante", "cena", "almuerzo"), "🍕"),
+        (("salud", "médico", "hospital", "farmacia", "doctor"), "🏥"),
+        (("transporte", "auto", "coche", "gasolina", "uber"), "🚗"),
+        (("vivienda", "casa", "hogar", "alquiler", "hipoteca"), "🏠"),
+        (("compras", "tienda", "shopping", "ropa", "moda"), "🛍️"),
+        (("entretenimiento", "cine", "netflix", "música", "juego"), "🎬"),
+        (("servicio", "público", "electricidad", "agua", "gas"), "💡"),
+    )
+)
+
 
 def _get_emoji_for_category(category_name: str) -> str:
     """Get appropriate emoji for a category name"""
@@ -79,20 +96,9 @@ def _get_emoji_for_category(category_name: str) -> str:
             return emoji
     
     # Fallback based on common patterns
-    if any(word in name_lower for word in ["comida", "alimento", "restaurante", "cena", "almuerzo"]):
-        return "🍕"
-    elif any(word in name_lower for word in ["salud", "médico", "hospital", "farmacia", "doctor"]):
-        return "🏥"
-    elif any(word in name_lower for word in ["transporte", "auto", "coche", "gasolina", "uber"]):
-        return "🚗"
-    elif any(word in name_lower for word in ["vivienda", "casa", "hogar", "alquiler", "hipoteca"]):
-        return "🏠"
-    elif any(word in name_lower for word in ["compras", "tienda", "shopping", "ropa", "moda"]):
-        return "🛍️"
-    elif any(word in name_lower for word in ["entretenimiento", "cine", "netflix", "música", "juego"]):
-        return "🎬"
-    elif any(word in name_lower for word in ["servicio", "público", "electricidad", "agua", "gas"]):
-        return "💡"
+    for pattern, emoji in _EMOJI_FALLBACK_PATTERNS:
+        if pattern.search(name_lower):
+            return emoji
     
     # Default fallback
     return "📋"
@@ -143,6 +149,7 @@ class CategoryService:
                 db.add(keyword_obj)
 
         db.commit()
+        invalidate_keyword_index(user_id)
         return categories
 
     @staticmethod
@@ -301,6 +308,8 @@ class CategoryService:
 
         db.commit()
         db.refresh(category)
+        # Renames change the category names the keyword index reports
+        invalidate_keyword_index(user_id)
         return category
 
     @staticmethod
@@ -334,11 +343,13 @@ class CategoryService:
             # Soft delete - mark as inactive
             category.is_active = False
             db.commit()
+            invalidate_keyword_index(user_id)
             return False  # Indicates soft delete
         else:
             # Hard delete if no transactions use it
             db.delete(category)
             db.commit()
+            invalidate_keyword_index(user_id)
             return True  # Indicates hard delete
 
     @staticmethod
@@ -401,17 +412,19 @@ class CategoryService:
             "usage_by_category": {}
         }
 
-        # Get transaction counts per category
-        for category in categories:
-            count = db.query(Transaction).join(
+        # Get transaction counts for all categories in one grouped query
+        counts_by_name = dict(
+            db.query(Transaction.category, func.count(Transaction.id)).join(
                 Transaction.card
             ).filter(
-                Transaction.card.has(user_id=user_id),
-                Transaction.category == category.name
-            ).count()
+                Card.user_id == user_id,
+                Transaction.category.in_([category.name for category in categories])
+            ).group_by(Transaction.category).all()
+        )
 
+        for category in categories:
             stats["usage_by_category"][category.name] = {
-                "transaction_count": count,
+                "transaction_count": counts_by_name.get(category.name, 0),
                 "is_default": category.is_default,
                 "has_keywords": bool(category.keywords)
             }
@@ -471,5 +484,6 @@ class CategoryService:
                 db.add(keyword_obj)
             
             db.commit()
+            invalidate_keyword_index(user_id)
         
         return income_category
@@ -9,6 +9,8 @@ import logging
 import openai
 import json
 import re
+import sys
+from datetime import datetime, date
 from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 
@@ -18,6 +20,41 @@ from app.services.pdf_service import PDFService
 
 logger = logging.getLogger(__name__)
 
+# PDF header signature; wrapped uploads ($BOP$...) carry it after a prefix
+_PDF_SIGNATURE = b'%PDF-'
+# JSON array wrapped in a Markdown code fence in model responses
+_JSON_FENCE_RE = re.compile(r'```(?:json)?\s*(\[.*?\])\s*```', re.DOTALL)
+# Transaction date formats accepted from the model, ISO first
+_DATE_FORMATS = ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d-%b-%Y", "%d/%b/%Y", "%d %B %Y")
+
+
+def _parse_amount(value: Any) -> Optional[float]:
+    """Parse a model-returned amount, either a number or a string like '1,234.50' or '12.00-'; None if unparseable"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or "").strip()
+    negative = text.endswith("-")
+    if negative:
+        text = text[:-1]
+    try:
+        amount = float(text.replace(",", ""))
+    except ValueError:
+        return None
+    return -amount if negative else amount
+
+
+# Shared currency code strings so every transaction dict points at the same object
+_CURRENCIES = {code: sys.intern(code) for code in ("PEN", "USD", "EUR")}
+_DEFAULT_CURRENCY = _CURRENCIES["PEN"]
+
+
+def _normalize_currency(value: Any) -> str:
+    """Return the interned upper-case currency code, defaulting to PEN"""
+    code = str(value or "").strip().upper()
+    if not code:
+        return _DEFAULT_CURRENCY
+    return _CURRENCIES.get(code) or sys.intern(code)
+
 
 class CleanAIStatementExtractor:
     """Universal AI Statement Extractor for any bank"""
@@ -31,6 +68,11 @@ class CleanAIStatementExtractor:
         logger.info(f"🔍 Using Universal Clean AI extraction (user: {user_id}, password provided: {password is not None})")
         logger.info(f"📄 PDF content size: {len(file_content)} bytes")
 
+        # Without a PDF header neither the text libraries nor the Vision fallback can read the
+        # file, so fail before running either; retrying the same upload cannot succeed
+        if _PDF_SIGNATURE not in file_content:
+            raise ProcessingError("Uploaded file is not a PDF document")
+
         try:
             # Store user_id temporarily for the private method
             self._current_user_id = user_id
@@ -152,7 +194,7 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
             logger.info(f"GPT-4o response: {len(content)} characters")
 
             # Parse JSON response
-            json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', content, re.DOTALL)
+            json_match = _JSON_FENCE_RE.search(content) if "```" in content else None
             if json_match:
                 json_str = json_match.group(1)
             else:
@@ -170,25 +212,23 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
             # Transform to expected format for UniversalStatementService
             transformed_transactions = []
             for txn in transactions:
+                amount = _parse_amount(txn.get('amount', 0))
+                if amount is None:
+                    logger.warning(f"Skipping transaction with unparseable amount {txn.get('amount')!r}: {txn.get('merchant')}")
+                    continue
+
                 # Parse date with full year (expecting ISO YYYY-MM-DD; try common fallbacks)
                 date_str = txn.get("date", "").strip()
                 if date_str:
                     try:
-                        from datetime import datetime, date
                         parsed_date = None
-                        # Try ISO first
-                        try:
-                            parsed_date = datetime.strptime(date_str, "%Y-%m-%d").date()
-                        except Exception:
-                            pass
-                        # Try common alternative formats if ISO fails
-                        if not parsed_date:
-                            for fmt in ("%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d-%b-%Y", "%d/%b/%Y", "%d %B %Y"):
-                                try:
-                                    parsed_date = datetime.strptime(date_str, fmt).date()
-                                    break
-                                except Exception:
-                                    continue
+                        # Try ISO first, then common alternative formats
+                        for fmt in _DATE_FORMATS:
+                            try:
+                                parsed_date = datetime.strptime(date_str, fmt).date()
+                                break
+                            except Exception:
+                                continue
                         if not parsed_date:
                             # Last attempt: fromisoformat (may handle variants)
                             try:
@@ -197,18 +237,16 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
                                 parsed_date = date.today()
                                 logger.warning(f"Could not parse date '{date_str}', defaulting to today")
                     except Exception:
-                        from datetime import date
                         parsed_date = date.today()
                         logger.warning(f"Date parsing error for '{date_str}', defaulting to today")
                 else:
-                    from datetime import date
                     parsed_date = date.today()
 
                 # Transform to expected field names
                 transformed_txn = {
                     'merchant': txn.get('merchant', 'Unknown'),  # Use AI-extracted merchant
-                    'amount': float(txn.get('amount', 0)),
-                    'currency': txn.get('currency', 'PEN'),
+                    'amount': amount,
+                    'currency': _normalize_currency(txn.get('currency')),
                     'transaction_date': parsed_date,  # parsed date object
                     'description': txn.get('description', txn.get('merchant', 'Unknown')),  # fallback to merchant if no description
                     'category': txn.get('category', None)  # category if provided
@@ -300,7 +338,7 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
             logger.info(f"GPT-4o Vision response: {len(content)} characters")
 
             # Parse JSON array from content
-            json_match = re.search(r'```(?:json)?\s*(\[.*?\])\s*```', content, re.DOTALL)
+            json_match = _JSON_FENCE_RE.search(content) if "```" in content else None
             if json_match:
                 json_str = json_match.group(1)
             else:
@@ -316,12 +354,16 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
 
             # Transform as in text path
             transformed: List[Dict[str, Any]] = []
-            from datetime import datetime, date
             for txn in raw:
+                amount = _parse_amount(txn.get('amount', 0))
+                if amount is None:
+                    logger.warning(f"Vision fallback: skipping transaction with unparseable amount {txn.get('amount')!r}: {txn.get('merchant')}")
+                    continue
+
                 date_str = (txn.get("date") or "").strip()
                 parsed_date = None
                 if date_str:
-                    for fmt in ("%Y-%m-%d", "%d-%m-%Y", "%d/%m/%Y", "%d %b %Y", "%d-%b-%Y", "%d/%b/%Y", "%d %B %Y"):
+                    for fmt in _DATE_FORMATS:
                         try:
                             parsed_date = datetime.strptime(date_str, fmt).date()
                             break
@@ -337,8 +379,8 @@ Extract ALL purchase transactions. Return ONLY the JSON array with no additional
 
                 transformed.append({
                     'merchant': txn.get('merchant', 'Unknown'),  # Use AI-extracted merchant
-                    'amount': float(txn.get('amount', 0) or 0),
-                    'currency': txn.get('currency', 'PEN'),
+                    'amount': amount,
+                    'currency': _normalize_currency(txn.get('currency')),
                     'transaction_date': parsed_date,
                     'description': txn.get('description', txn.get('merchant', 'Unknown')),  # fallback to merchant if no description
                     'category': txn.get('category')
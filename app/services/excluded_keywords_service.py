@@ -1,9 +1,16 @@
-import unicodedata
-from typing import List
+import re
+from typing import Dict, FrozenSet, List, Optional, Pattern, Set, Tuple
 from sqlalchemy.orm import Session
 
 from app.models.user_excluded_keyword import UserExcludedKeyword
 from app.core.database import Base, engine
+from app.utils.text import normalize_text as _normalize
+
+try:
+    # google-re2 compiles the keyword alternation to a linear-time automaton when installed
+    import re2 as _re_engine
+except ImportError:
+    _re_engine = re
 
 DEFAULT_EXCLUDED_KEYWORDS = [
     "INTERESES",
@@ -15,14 +22,8 @@ DEFAULT_EXCLUDED_KEYWORDS = [
 ]
 
 
-def _normalize(text: str) -> str:
-    if not text:
-        return ""
-    # Lowercase, strip, remove diacritics
-    text = text.strip().lower()
-    text = unicodedata.normalize("NFD", text)
-    text = "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
-    return text
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
 
 
 class ExcludedKeywordsService:
@@ -30,6 +31,8 @@ class ExcludedKeywordsService:
 
     def __init__(self, db: Session):
         self.db = db
+        # user_id -> (keyword alternation or None if no keywords, trigram prefilter or None if a keyword is too short)
+        self._match_cache: Dict[str, Tuple[Optional[Pattern[str]], Optional[FrozenSet[str]]]] = {}
         # Ensure table exists (idempotent)
         try:
             Base.metadata.create_all(bind=engine, tables=[UserExcludedKeyword.__table__])
@@ -53,8 +56,7 @@ class ExcludedKeywordsService:
         )
         if existing:
             return
-        for kw in DEFAULT_EXCLUDED_KEYWORDS:
-            self.add_keyword(user_id, kw)
+        self._add_default_keywords(user_id)
 
     def add_keyword(self, user_id: str, keyword: str) -> UserExcludedKeyword:
         kw_norm = _normalize(keyword)
@@ -77,6 +79,7 @@ class ExcludedKeywordsService:
         self.db.add(item)
         self.db.commit()
         self.db.refresh(item)
+        self._match_cache.pop(str(user_id), None)
         return item
 
     def delete_keyword(self, user_id: str, keyword_id: str) -> bool:
@@ -89,25 +92,58 @@ class ExcludedKeywordsService:
             return False
         self.db.delete(item)
         self.db.commit()
+        self._match_cache.pop(str(user_id), None)
         return True
 
     def reset_defaults(self, user_id: str) -> None:
         self.db.query(UserExcludedKeyword).filter(UserExcludedKeyword.user_id == user_id).delete()
         self.db.commit()
+        self._match_cache.pop(str(user_id), None)
+        self._add_default_keywords(user_id)
+
+    def _add_default_keywords(self, user_id: str) -> None:
+        """Add the missing default keywords with one existence query and a single commit"""
+        existing = {
+            kw_norm
+            for (kw_norm,) in self.db.query(UserExcludedKeyword.keyword_normalized)
+            .filter(UserExcludedKeyword.user_id == user_id)
+        }
         for kw in DEFAULT_EXCLUDED_KEYWORDS:
-            self.add_keyword(user_id, kw)
+            kw_norm = _normalize(kw)
+            if kw_norm in existing:
+                continue
+            existing.add(kw_norm)
+            self.db.add(UserExcludedKeyword(
+                user_id=user_id,
+                keyword=kw.strip(),
+                keyword_normalized=kw_norm,
+            ))
+        self.db.commit()
+        self._match_cache.pop(str(user_id), None)
+
+    def _get_match_index(self, user_id: str) -> Tuple[Optional[Pattern[str]], Optional[FrozenSet[str]]]:
+        key = str(user_id)
+        cached = self._match_cache.get(key)
+        if cached is None:
+            keywords = {k.keyword_normalized for k in self.list_keywords(user_id) if k.keyword_normalized}
+            # One alternation scans the text once instead of one substring scan per keyword
+            pattern = _re_engine.compile("|".join(map(re.escape, sorted(keywords)))) if keywords else None
+            # Every keyword of 3+ chars shares a trigram with any text containing it,
+            # so text with no trigram in this set cannot match. Short keywords disable the filter.
+            if all(len(kn) >= 3 for kn in keywords):
+                prefilter = frozenset().union(*(_trigrams(kn) for kn in keywords))
+            else:
+                prefilter = None
+            cached = (pattern, prefilter)
+            self._match_cache[key] = cached
+        return cached
 
     def should_exclude(self, user_id: str, merchant: str, description: str) -> bool:
-        # Fetch user keywords once; could cache if needed
-        keywords = self.list_keywords(user_id)
-        if not keywords:
+        pattern, prefilter = self._get_match_index(user_id)
+        if pattern is None:
             return False
-        m = _normalize(merchant)
-        d = _normalize(description)
-        for k in keywords:
-            kn = k.keyword_normalized
-            if not kn:
-                continue
-            if kn in m or kn in d:
-                return True
-        return False
+        # Scan merchant and description as one buffer: a single normalize, trigram and regex pass
+        text = _normalize(f"{merchant or ''}\n{description or ''}")
+        if prefilter is not None and prefilter.isdisjoint(_trigrams(text)):
+            return False
+        return pattern.search(text) is not None
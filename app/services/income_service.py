@@ -1,17 +1,31 @@
 from sqlalchemy.orm import Session
-from datetime import datetime, date, timedelta
+from sqlalchemy import func, or_
+from datetime import datetime, date
 from typing import List
+import calendar
 import logging
-import pytz
-from dateutil.relativedelta import relativedelta
+from zoneinfo import ZoneInfo
 
 from app.models.income import Income
 from app.models.transaction import Transaction
-from app.schemas.income import IncomeCreate
 from app.services.category_service import CategoryService
 
 logger = logging.getLogger(__name__)
 
+# Recurring incomes are scheduled on the Peru calendar day
+PERU_TZ = ZoneInfo('America/Lima')
+
+# Rows written per INSERT/commit when backfilling long recurring histories
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def _advance_month(current_date: date, target_day: int) -> date:
+    """Step to the following month on target_day, or its last day if the month is shorter (e.g. Feb 31)"""
+    year, month = divmod(current_date.year * 12 + current_date.month, 12)
+    month += 1
+    return date(year, month, min(target_day, calendar.monthrange(year, month)[1]))
+
+
 class IncomeService:
     def __init__(self, db: Session):
         self.db = db
@@ -23,54 +37,50 @@ class IncomeService:
         Returns the number of new transaction records created.
         """
         # Get current date in Peru timezone (UTC-5)
-        peru_tz = pytz.timezone('America/Lima')
-        now_peru = datetime.now(peru_tz)
-        today_peru = now_peru.date()
+        today_peru = datetime.now(PERU_TZ).date()
         
-        # Get all recurring incomes
+        # Get recurring incomes due today that have not been processed yet
         recurring_incomes = self.db.query(Income).filter(
             Income.is_recurring == True,
-            Income.recurring_day.isnot(None)
+            Income.recurring_day == today_peru.day,
+            or_(Income.last_processed_date.is_(None), Income.last_processed_date < today_peru)
         ).all()
         
-        created_count = 0
+        new_rows = []
+        processed_ids = []
+        income_category_by_user = {}
         
         for income in recurring_incomes:
-            # Check if today is the recurrence day
-            if today_peru.day != income.recurring_day:
-                continue
-                
-            # Check if this recurring income has already been processed today
-            if income.last_processed_date == today_peru:
-                continue
-                
             # Validate income amount is positive before creating transaction
             income.validate_amount()
             
-            # Get the system Income category
-            income_category = CategoryService.get_income_category(self.db, income.user_id)
-            
-            # Create transaction for this recurring income
-            transaction = Transaction(
-                card_id=income.card_id,
-                merchant=income.source,
-                amount=income.amount,
-                currency=income.currency,
-                category=income_category.name,  # Use database Income category
-                transaction_date=today_peru,
-                description=f"Recurring income: {income.description}"
-            )
-            
-            self.db.add(transaction)
+            # Get the system Income category, once per user
+            income_category = income_category_by_user.get(income.user_id)
+            if income_category is None:
+                income_category = CategoryService.get_income_category(self.db, income.user_id)
+                income_category_by_user[income.user_id] = income_category
             
-            # Update last processed date
-            income.last_processed_date = today_peru
-            
-            created_count += 1
+            # Collect the transaction row for this recurring income
+            new_rows.append({
+                "card_id": income.card_id,
+                "merchant": income.source,
+                "amount": income.amount,
+                "currency": income.currency,
+                "category": income_category.name,  # Use database Income category
+                "transaction_date": today_peru,
+                "description": f"Recurring income: {income.description}"
+            })
+            processed_ids.append(income.id)
             
             logger.info(f"Created recurring transaction: {income.source} - {income.amount} {income.currency} for {today_peru}")
         
+        created_count = len(new_rows)
         if created_count > 0:
+            # One batched INSERT for the transactions and one UPDATE for the processed incomes
+            self.db.bulk_insert_mappings(Transaction, new_rows)
+            self.db.query(Income).filter(Income.id.in_(processed_ids)).update(
+                {"last_processed_date": today_peru}, synchronize_session=False
+            )
             self.db.commit()
             logger.info(f"Created {created_count} recurring transaction records for {today_peru}")
         
@@ -93,13 +103,13 @@ class IncomeService:
     
     def get_total_income_by_period(self, user_id: str, start_date: date, end_date: date) -> float:
         """Calculate total income for a user within a date range"""
-        result = self.db.query(Income).filter(
+        total = self.db.query(func.coalesce(func.sum(Income.amount), 0)).filter(
             Income.user_id == user_id,
             Income.income_date >= start_date,
             Income.income_date <= end_date
-        ).all()
+        ).scalar()
         
-        return sum(float(income.amount) for income in result)
+        return float(total)
     
     def create_income_from_recurring(self, recurring_income: Income, target_date: date) -> Income:
         """Create a new income record from a recurring income template"""
@@ -129,10 +139,9 @@ class IncomeService:
         if not income.is_recurring or not income.recurring_day:
             return 0
             
-        peru_tz = pytz.timezone('America/Lima')
-        now_peru = datetime.now(peru_tz)
-        today_peru = now_peru.date()
+        today_peru = datetime.now(PERU_TZ).date()
         
+        pending_rows = []
         created_count = 0
         
         # Start from the original income date
@@ -156,34 +165,33 @@ class IncomeService:
             
             # Skip the original transaction (it will be created separately)
             if should_create and current_date != income.income_date:
-                transaction = Transaction(
-                    card_id=income.card_id,
-                    merchant=income.source,  # Use income source as merchant
-                    amount=income.amount,
-                    currency=income.currency,
-                    category=income_category.name,
-                    transaction_date=current_date,
-                    description=f"Recurring income: {income.description}"
-                )
-                
-                self.db.add(transaction)
-                created_count += 1
+                pending_rows.append({
+                    "card_id": income.card_id,
+                    "merchant": income.source,  # Use income source as merchant
+                    "amount": income.amount,
+                    "currency": income.currency,
+                    "category": income_category.name,
+                    "transaction_date": current_date,
+                    "description": f"Recurring income: {income.description}"
+                })
                 logger.info(f"Created past recurring transaction: {income.source} - {income.amount} {income.currency} for {current_date}")
+                
+                # Write full chunks as we go so long histories don't pile up in memory
+                if len(pending_rows) >= BACKFILL_CHUNK_SIZE:
+                    self.db.bulk_insert_mappings(Transaction, pending_rows)
+                    self.db.commit()
+                    created_count += len(pending_rows)
+                    pending_rows.clear()
             
             # Move to next month, always trying to get to the recurring day
-            next_date = current_date + relativedelta(months=1)
-            
-            # Try to set to the recurring day
-            try:
-                next_date = next_date.replace(day=income.recurring_day)
-            except ValueError:
-                # If the day doesn't exist in this month (e.g., Feb 31), use last day of month
-                next_date = next_date + relativedelta(day=31)  # This will give us the last day
-                
-            current_date = next_date
+            current_date = _advance_month(current_date, income.recurring_day)
         
-        if created_count > 0:
+        if pending_rows:
+            self.db.bulk_insert_mappings(Transaction, pending_rows)
             self.db.commit()
+            created_count += len(pending_rows)
+        
+        if created_count > 0:
             logger.info(f"Created {created_count} past recurring transaction records")
         
         return created_count
\ No newline at end of file
@@ -2,19 +2,23 @@
 Keyword-based categorization service that replaces AI categorization.
 Provides deterministic transaction categorization using user-defined keywords.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
 import logging
+from collections import defaultdict
 
 from app.models.category_keyword import CategoryKeyword
 from app.models.category import Category
 from app.models.transaction import Transaction
-from app.services.keyword_service import KeywordService
+from app.services.keyword_service import KeywordIndex, KeywordService
 from app.schemas.category import CategoryKeywordMatch
 
 logger = logging.getLogger(__name__)
 
+# Apostrophes and spaces are dropped from transaction text before matching
+_MATCH_STRIP = str.maketrans("", "", "' ")
+
 
 class KeywordCategorizationService:
     """Service for pure keyword-based transaction categorization"""
@@ -28,55 +32,70 @@ class KeywordCategorizationService:
         Categorize a single transaction using keyword matching.
         Returns the best matching category with confidence score.
         """
-        # Get all user keywords
-        keywords = self.keyword_service.get_user_keywords(user_id)
+        # Get the user's compiled keywords
+        keyword_index = self.keyword_service.get_keyword_index(user_id)
         
-        if not keywords:
+        if not keyword_index.entries:
             logger.warning(f"No keywords found for user {user_id}")
             return None
         
-        text_to_match = f"{merchant} {description}".lower().strip()
+        return self._categorize_with_keywords(keyword_index, merchant, description)
+    
+    def _get_batch_keyword_index(self, user_id: str) -> KeywordIndex:
+        """Get the user's compiled keywords once for a whole batch"""
+        keyword_index = self.keyword_service.get_keyword_index(user_id)
+        if not keyword_index.entries:
+            logger.warning(f"No keywords found for user {user_id}")
+        return keyword_index
+    
+    def _categorize_with_keywords(
+        self,
+        keyword_index: KeywordIndex,
+        merchant: str,
+        description: str = "",
+        match_cache: Optional[Dict[str, Optional[CategoryKeywordMatch]]] = None
+    ) -> Optional[CategoryKeywordMatch]:
+        """
+        Match a transaction against keywords already loaded by the caller.
+        Batch callers pass a match_cache dict so repeated merchants are scored once.
+        """
+        if not keyword_index.entries:
+            return None
+        
         # Normalize apostrophes and spaces for consistent matching
-        text_to_match = text_to_match.replace("'", "")
-        text_to_match = text_to_match.replace(" ", "")
+        text_to_match = f"{merchant} {description}".lower().strip().translate(_MATCH_STRIP)
+        if not text_to_match:
+            return None
         
-        # Group keywords by category and find matches
-        category_matches = {}
+        if match_cache is None:
+            return self._score_keyword_matches(keyword_index, text_to_match)
         
-        for keyword_obj in keywords:
-            keyword_text = keyword_obj.keyword.lower()
-            
-            if keyword_text in text_to_match:
-                category_id = keyword_obj.category_id
-                category_name = keyword_obj.category.name if keyword_obj.category else "Unknown"
-                
-                if category_id not in category_matches:
-                    category_matches[category_id] = {
-                        'category_name': category_name,
-                        'matched_keywords': [],
-                        'total_keywords': 0
-                    }
-                
-                category_matches[category_id]['matched_keywords'].append(keyword_text)
+        if text_to_match not in match_cache:
+            match_cache[text_to_match] = self._score_keyword_matches(keyword_index, text_to_match)
+        return match_cache[text_to_match]
+    
+    def _score_keyword_matches(self, keyword_index: KeywordIndex, text_to_match: str) -> Optional[CategoryKeywordMatch]:
+        """Pick the best scoring category among the keywords found in the normalized text"""
+        # Group matched keywords by category
+        matched = defaultdict(list)
+        entries = keyword_index.entries
         
-        # Count total keywords per category to calculate confidence
-        for keyword_obj in keywords:
-            category_id = keyword_obj.category_id
-            if category_id in category_matches:
-                category_matches[category_id]['total_keywords'] += 1
+        for position in keyword_index.find(text_to_match):
+            category_id, _, keyword_text = entries[position]
+            matched[category_id].append(keyword_text)
         
-        if not category_matches:
+        if not matched:
             logger.info(f"No keyword matches found for: {text_to_match}")
             return None
         
         # Find the best match (highest confidence)
         best_category_id = None
         best_confidence = 0.0
-        best_match_data = None
+        best_keywords = None
         
-        for category_id, match_data in category_matches.items():
-            matched_count = len(match_data['matched_keywords'])
-            total_count = max(match_data['total_keywords'], 1)
+        for category_id, matched_keywords in matched.items():
+            matched_count = len(matched_keywords)
+            total_count = max(keyword_index.total_by_category[category_id], 1)
             
             # Base confidence on ratio of matched keywords
             confidence = matched_count / total_count
@@ -86,7 +105,7 @@ class KeywordCategorizationService:
                 confidence += 0.1 * (matched_count - 1)
             
             # Boost confidence for longer keywords
-            for keyword in match_data['matched_keywords']:
+            for keyword in matched_keywords:
                 if len(keyword) > 5:
                     confidence += 0.05
             
@@ -96,18 +115,38 @@ class KeywordCategorizationService:
             if confidence > best_confidence:
                 best_confidence = confidence
                 best_category_id = category_id
-                best_match_data = match_data
+                best_keywords = matched_keywords
+                # Nothing can beat a capped score
+                if best_confidence >= 1.0:
+                    break
         
-        if best_match_data:
+        if best_keywords:
             return CategoryKeywordMatch(
                 category_id=best_category_id,
-                category_name=best_match_data['category_name'],
-                matched_keywords=best_match_data['matched_keywords'],
+                category_name=keyword_index.category_names[best_category_id],
+                matched_keywords=best_keywords,
                 confidence=best_confidence
             )
         
         return None
     
+    def categorize_many(
+        self,
+        user_id: str,
+        merchants_and_descriptions: List[Tuple[str, str]]
+    ) -> List[Optional[CategoryKeywordMatch]]:
+        """
+        Categorize several (merchant, description) pairs with one keyword load.
+        Returns one match (or None) per pair, in input order.
+        """
+        keyword_index = self._get_batch_keyword_index(user_id)
+        match_cache = {}
+        
+        return [
+            self._categorize_with_keywords(keyword_index, merchant, description, match_cache)
+            for merchant, description in merchants_and_descriptions
+        ]
+    
     def categorize_transactions_batch(
         self, 
         user_id: str, 
@@ -125,12 +164,16 @@ class KeywordCategorizationService:
         """
         categorized_transactions = []
         
+        # Load the user's keywords once for the whole batch
+        keyword_index = self._get_batch_keyword_index(user_id)
+        match_cache = {}
+        
         for txn in transactions:
             merchant = txn.get('merchant', txn.get('description', ''))
             description = txn.get('description', '')
             
             # Attempt keyword categorization
-            match = self.categorize_transaction(user_id, merchant, description)
+            match = self._categorize_with_keywords(keyword_index, merchant, description, match_cache)
             
             # Add categorization results to transaction
             categorized_txn = txn.copy()
@@ -157,7 +200,8 @@ class KeywordCategorizationService:
         self, 
         user_id: str, 
         transactions: List[Transaction],
-        force_recategorize: bool = False
+        force_recategorize: bool = False,
+        include_details: bool = True
     ) -> Dict[str, Any]:
         """
         Categorize Transaction objects in the database using keywords.
@@ -166,6 +210,7 @@ class KeywordCategorizationService:
             user_id: User ID
             transactions: List of Transaction model objects
             force_recategorize: Whether to recategorize already categorized transactions
+            include_details: Whether to build the per-transaction categorization_details list
             
         Returns:
             Dictionary with categorization results and statistics
@@ -177,57 +222,83 @@ class KeywordCategorizationService:
             'categorization_details': []
         }
 
-        for transaction in transactions:
+        # Load the user's keywords once for the whole batch
+        keyword_index = self._get_batch_keyword_index(user_id)
+        match_cache = {}
+
+        # Collected {id, category, ai_confidence} rows, written with one bulk UPDATE
+        updates = []
+        details = results['categorization_details']
+
+        # Read the ORM attributes once into plain tuples for the matching loop
+        rows = [
+            (t.id, t.merchant, t.description or "", t.category, t.ai_confidence)
+            for t in transactions
+        ]
+
+        for transaction_id, merchant, description, category, ai_confidence in rows:
             # Skip if already categorized (unless force_recategorize is True)
-            if not force_recategorize and transaction.category and transaction.category != 'Sin categoría':
+            if not force_recategorize and category and category != 'Sin categoría':
                 results['categorized'] += 1
-                results['categorization_details'].append({
-                    'transaction_id': str(transaction.id),
-                    'method': 'existing',
-                    'category': transaction.category,
-                    'confidence': getattr(transaction, 'ai_confidence', 1.0)
-                })
+                if include_details:
+                    details.append({
+                        'transaction_id': str(transaction_id),
+                        'method': 'existing',
+                        'category': category,
+                        'confidence': ai_confidence
+                    })
                 continue
 
             # Attempt keyword categorization
-            match = self.categorize_transaction(
-                user_id, 
-                transaction.merchant, 
-                transaction.description or ""
+            match = self._categorize_with_keywords(
+                keyword_index, 
+                merchant, 
+                description,
+                match_cache
             )
             
             if match:
                 # Update transaction with keyword categorization
-                transaction.category = match.category_name
-                transaction.ai_confidence = match.confidence
-                
-                results['categorized'] += 1
-                results['categorization_details'].append({
-                    'transaction_id': str(transaction.id),
-                    'method': 'keyword',
+                updates.append({
+                    'id': transaction_id,
                     'category': match.category_name,
-                    'confidence': match.confidence,
-                    'matched_keywords': match.matched_keywords
+                    'ai_confidence': match.confidence
                 })
                 
-                logger.info(f"Keyword categorized transaction {transaction.id}: {transaction.merchant} -> {match.category_name}")
+                results['categorized'] += 1
+                if include_details:
+                    details.append({
+                        'transaction_id': str(transaction_id),
+                        'method': 'keyword',
+                        'category': match.category_name,
+                        'confidence': match.confidence,
+                        'matched_keywords': match.matched_keywords
+                    })
+                
+                logger.info(f"Keyword categorized transaction {transaction_id}: {merchant} -> {match.category_name}")
             else:
                 # Set to uncategorized
-                transaction.category = 'Sin categoría'
-                transaction.ai_confidence = 0.0
-                
-                results['uncategorized'] += 1
-                results['categorization_details'].append({
-                    'transaction_id': str(transaction.id),
-                    'method': 'uncategorized',
+                updates.append({
+                    'id': transaction_id,
                     'category': 'Sin categoría',
-                    'confidence': 0.0
+                    'ai_confidence': 0.0
                 })
                 
-                logger.info(f"No keyword match for transaction {transaction.id}: {transaction.merchant}")
+                results['uncategorized'] += 1
+                if include_details:
+                    details.append({
+                        'transaction_id': str(transaction_id),
+                        'method': 'uncategorized',
+                        'category': 'Sin categoría',
+                        'confidence': 0.0
+                    })
+                
+                logger.info(f"No keyword match for transaction {transaction_id}: {merchant}")
         
         # Commit changes to database
         try:
+            if updates:
+                self.db.bulk_update_mappings(Transaction, updates)
             self.db.commit()
             logger.info(f"Keyword categorization completed: {results['categorized']} categorized, {results['uncategorized']} uncategorized")
         except Exception as e:
@@ -254,9 +325,11 @@ class KeywordCategorizationService:
             List of categorization previews
         """
         previews = []
+        keyword_index = self.keyword_service.get_keyword_index(user_id)
+        match_cache = {}
         
         for description in transaction_descriptions:
-            match = self.categorize_transaction(user_id, description, "")
+            match = self._categorize_with_keywords(keyword_index, description, "", match_cache)
             
             preview = {
                 'description': description,
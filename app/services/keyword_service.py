@@ -2,27 +2,180 @@
 Service for managing category keywords for users.
 Provides CRUD operations for user-defined keywords that categorize transactions.
 """
-from typing import List, Optional, Dict, Any
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
+from typing import List, Optional, Dict, Any, Mapping, Tuple
+from types import MappingProxyType
+from collections import Counter, OrderedDict
+import threading
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import and_, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.models.category_keyword import CategoryKeyword
 from app.models.category import Category
 from app.models.user import User
 
+try:
+    import ahocorasick
+except ImportError:  # Fall back to plain substring checks
+    ahocorasick = None
+
+# Default keywords mapping - curated keywords per category in Spanish, stored already
+# lowercased and stripped and shared read-only across calls and threads
+_DEFAULT_KEYWORDS: Mapping[str, Tuple[str, ...]] = MappingProxyType({
+    'Alimentación': (
+        'la lucha', 'norkys', 'rokys', 'bembos', 'pizza hut',
+        'san antonio', 'tottus', 'plazavea', 'la iberica', 'papa johns'
+    ),
+    'Compras': (
+        'ripley', 'saga falabella', 'oechsle', 'linio', 'mercadolibre',
+        'coolbox', 'hiraoka', 'casaideas', 'miniso', 'curacao'
+    ),
+    'Entretenimiento': (
+        'cineplanet', 'cinépolis', 'netflix', 'spotify', 'joinnus',
+        'teleticket', 'epic games', 'steam', 'claro video', 'disney plus'
+    ),
+    'Vivienda': (
+        'pacifico seguros', 'rimac seguros', 'la positiva', 'los portales',
+        'decor center', 'decorlux', 'sodimac', 'promart', 'ferretti',
+        'cassinelli'
+    ),
+    'Otros': (
+        'serpost', 'sunat', 'reniec', 'essalud', 'inkafarma',
+        'boticas peru', 'western union', 'claro peru', 'entel peru',
+        'movistar peru'
+    )
+})
+
+# Compiled keyword indexes shared across requests, keyed by user and validated against a
+# cheap fingerprint of the user's keywords and categories before reuse
+_INDEX_CACHE_SIZE = 256
+_index_cache: "OrderedDict[str, Tuple[tuple, KeywordIndex]]" = OrderedDict()
+_index_cache_lock = threading.Lock()
+# Bumped by keyword and category writes in this process, so service instances re-check
+# an index they already validated once the user's keywords may have changed
+_index_generations: Dict[str, int] = {}
+
+
+def invalidate_keyword_index(user_id) -> None:
+    """Drop the user's cached keyword index after a keyword or category write"""
+    cache_key = str(user_id)
+    with _index_cache_lock:
+        _index_cache.pop(cache_key, None)
+        _index_generations[cache_key] = _index_generations.get(cache_key, 0) + 1
+
+
+class KeywordIndex:
+    """User keywords prepared once so each transaction text is scanned in a single pass"""
+
+    def __init__(self, keyword_rows: List[Tuple[Any, Optional[str], str]]):
+        # (category_id, category_name, lowercased keyword) per keyword, resolved once
+        self.entries: List[Tuple[Any, str, str]] = [
+            (category_id, category_name or "Unknown", keyword_text)
+            for category_id, category_name, keyword_text in keyword_rows
+        ]
+        self.category_names = {category_id: category_name for category_id, category_name, _ in self.entries}
+        # Keyword count per category, the denominator of the confidence ratio
+        self.total_by_category = Counter(category_id for category_id, _, _ in self.entries)
+        # Lowercased keyword text -> positions in entries (the same text can live in several categories)
+        self.positions: Dict[str, List[int]] = {}
+        for position, (_, _, keyword_text) in enumerate(self.entries):
+            if keyword_text:
+                self.positions.setdefault(keyword_text, []).append(position)
+
+        # No keyword can fit inside a text shorter than the shortest keyword
+        self.min_length = min(map(len, self.positions), default=0)
+
+        self.automaton = None
+        if ahocorasick is not None and self.positions:
+            self.automaton = ahocorasick.Automaton()
+            for keyword_text, keyword_positions in self.positions.items():
+                self.automaton.add_word(keyword_text, tuple(keyword_positions))
+            self.automaton.make_automaton()
+
+    def find(self, text: str) -> List[int]:
+        """Positions of every keyword contained in text, in keyword order"""
+        hits = set()
+        if not self.positions or len(text) < self.min_length:
+            return []
+        if self.automaton is not None:
+            for _, keyword_positions in self.automaton.iter(text):
+                hits.update(keyword_positions)
+        else:
+            for keyword_text, keyword_positions in self.positions.items():
+                if len(keyword_text) <= len(text) and keyword_text in text:
+                    hits.update(keyword_positions)
+        return sorted(hits)
+
 
 class KeywordService:
     """Service for managing category keywords"""
     
     def __init__(self, db_session: Session):
         self.db = db_session
+        # (generation, index) already checked against the database by this instance (one request
+        # or task), so repeated categorize calls skip the fingerprint query
+        self._checked_indexes: Dict[str, Tuple[int, KeywordIndex]] = {}
     
     def get_user_keywords(self, user_id: str) -> List[CategoryKeyword]:
-        """Get all keywords for a user"""
-        return self.db.query(CategoryKeyword).filter(
+        """Get all keywords for a user, oldest first, with their categories loaded in one extra query"""
+        # Explicit order: first-match categorization must not depend on which index the planner picks
+        return self.db.query(CategoryKeyword).options(
+            selectinload(CategoryKeyword.category)
+        ).filter(
             CategoryKeyword.user_id == user_id
+        ).order_by(
+            CategoryKeyword.created_at
         ).all()
     
+    def get_keyword_index(self, user_id: str) -> KeywordIndex:
+        """
+        Get the user's compiled keyword index, reusing the process-wide cached copy while
+        the user's keywords and category names are unchanged. The freshness check runs once
+        per service instance and user.
+        """
+        cache_key = str(user_id)
+        with _index_cache_lock:
+            generation = _index_generations.get(cache_key, 0)
+        checked = self._checked_indexes.get(cache_key)
+        if checked is not None and checked[0] == generation:
+            return checked[1]
+        
+        # Any keyword insert, delete or edit, or a category rename, changes this fingerprint
+        fingerprint = tuple(self.db.query(
+            func.count(CategoryKeyword.id),
+            func.max(CategoryKeyword.created_at),
+            func.max(CategoryKeyword.updated_at),
+            func.max(Category.updated_at)
+        ).outerjoin(Category, CategoryKeyword.category_id == Category.id).filter(
+            CategoryKeyword.user_id == user_id
+        ).one())
+        
+        with _index_cache_lock:
+            cached = _index_cache.get(cache_key)
+            if cached is not None and cached[0] == fingerprint:
+                _index_cache.move_to_end(cache_key)
+                self._checked_indexes[cache_key] = (generation, cached[1])
+                return cached[1]
+        
+        # Plain column tuples: the index never needs ORM instances
+        keyword_rows = self.db.query(
+            CategoryKeyword.category_id,
+            Category.name,
+            CategoryKeyword.keyword
+        ).outerjoin(Category, CategoryKeyword.category_id == Category.id).filter(
+            CategoryKeyword.user_id == user_id
+        ).order_by(
+            CategoryKeyword.created_at
+        ).all()
+        keyword_index = KeywordIndex(keyword_rows)
+        with _index_cache_lock:
+            _index_cache[cache_key] = (fingerprint, keyword_index)
+            _index_cache.move_to_end(cache_key)
+            while len(_index_cache) > _INDEX_CACHE_SIZE:
+                _index_cache.popitem(last=False)
+        self._checked_indexes[cache_key] = (generation, keyword_index)
+        return keyword_index
+    
     def get_keywords_by_category(self, user_id: str, category_id: str) -> List[CategoryKeyword]:
         """Get all keywords for a specific category"""
         return self.db.query(CategoryKeyword).filter(
@@ -34,12 +187,13 @@ class KeywordService:
     
     def add_keyword(self, user_id: str, category_id: str, keyword: str, description: str = None) -> CategoryKeyword:
         """Add a new keyword to a category"""
+        normalized_keyword = keyword.lower().strip()
         # Check if keyword already exists for this user and category
         existing = self.db.query(CategoryKeyword).filter(
             and_(
                 CategoryKeyword.user_id == user_id,
                 CategoryKeyword.category_id == category_id,
-                CategoryKeyword.keyword == keyword.lower().strip()
+                CategoryKeyword.keyword == normalized_keyword
             )
         ).first()
         
@@ -60,13 +214,14 @@ class KeywordService:
         new_keyword = CategoryKeyword(
             user_id=user_id,
             category_id=category_id,
-            keyword=keyword.lower().strip(),
+            keyword=normalized_keyword,
             description=description
         )
         
         self.db.add(new_keyword)
         self.db.commit()
         self.db.refresh(new_keyword)
+        invalidate_keyword_index(user_id)
         
         return new_keyword
     
@@ -84,6 +239,7 @@ class KeywordService:
         
         self.db.delete(keyword)
         self.db.commit()
+        invalidate_keyword_index(user_id)
         return True
 
     def remove_keywords_bulk(self, user_id: str, keyword_ids: List[str]) -> int:
@@ -91,18 +247,18 @@ class KeywordService:
         if not keyword_ids:
             return 0
 
-        delete_q = self.db.query(CategoryKeyword).filter(
+        # Query.delete returns the number of matched rows, no separate COUNT needed
+        deleted_count = self.db.query(CategoryKeyword).filter(
             and_(
                 CategoryKeyword.user_id == user_id,
                 CategoryKeyword.id.in_(keyword_ids)
             )
-        )
-        deleted_count = delete_q.count()
+        ).delete(synchronize_session=False)
         if deleted_count == 0:
             return 0
 
-        delete_q.delete(synchronize_session=False)
         self.db.commit()
+        invalidate_keyword_index(user_id)
         return deleted_count
     
     def update_keyword(self, user_id: str, keyword_id: str, keyword_text: str = None, description: str = None) -> Optional[CategoryKeyword]:
@@ -118,12 +274,13 @@ class KeywordService:
             return None
         
         if keyword_text is not None:
+            normalized_keyword = keyword_text.lower().strip()
             # Check if new keyword text conflicts with existing keywords
             existing = self.db.query(CategoryKeyword).filter(
                 and_(
                     CategoryKeyword.user_id == user_id,
                     CategoryKeyword.category_id == keyword.category_id,
-                    CategoryKeyword.keyword == keyword_text.lower().strip(),
+                    CategoryKeyword.keyword == normalized_keyword,
                     CategoryKeyword.id != keyword_id
                 )
             ).first()
@@ -131,13 +288,14 @@ class KeywordService:
             if existing:
                 raise ValueError(f"Keyword '{keyword_text}' already exists for this category")
             
-            keyword.keyword = keyword_text.lower().strip()
+            keyword.keyword = normalized_keyword
         
         if description is not None:
             keyword.description = description
         
         self.db.commit()
         self.db.refresh(keyword)
+        invalidate_keyword_index(user_id)
         
         return keyword
     
@@ -155,18 +313,18 @@ class KeywordService:
         Categorize a transaction based on user's keywords.
         Returns category_id if a match is found, None otherwise.
         """
-        # Get all user keywords
-        keywords = self.get_user_keywords(user_id)
+        # Get the user's compiled keywords
+        keyword_index = self.get_keyword_index(user_id)
         
-        if not keywords:
+        if not keyword_index.entries:
             return None
         
         transaction_desc_lower = transaction_description.lower()
         
-        # Simple keyword matching - check if any keyword appears in transaction description
-        for keyword_obj in keywords:
-            if keyword_obj.keyword in transaction_desc_lower:
-                return keyword_obj.category_id
+        # Single-pass keyword scan; the first keyword (in keyword order) found in the description wins
+        positions = keyword_index.find(transaction_desc_lower)
+        if positions:
+            return keyword_index.entries[positions[0]][0]
         
         return None
     
@@ -174,18 +332,19 @@ class KeywordService:
         """Get a summary of keywords grouped by categories"""
         keywords = self.get_user_keywords(user_id)
         
-        # Group by category
+        # Group by category (categories arrive eagerly loaded with the keywords)
         summary = {}
         for keyword in keywords:
             category_name = keyword.category.name if keyword.category else "Unknown"
-            if category_name not in summary:
-                summary[category_name] = {
+            group = summary.get(category_name)
+            if group is None:
+                group = summary[category_name] = {
                     'category_id': keyword.category_id,
                     'category_name': category_name,
                     'keywords': []
                 }
             
-            summary[category_name]['keywords'].append({
+            group['keywords'].append({
                 'id': keyword.id,
                 'keyword': keyword.keyword,
                 'description': keyword.description,
@@ -199,44 +358,38 @@ class KeywordService:
         # Get user's categories
         categories = self.db.query(Category).filter(Category.user_id == user_id).all()
         
-        # Default keywords mapping - curated keywords per category in Spanish
-        default_keywords = {
-            'Alimentación': [
-                'la lucha', 'norkys', 'rokys', 'bembos', 'pizza hut',
-                'san antonio', 'tottus', 'plazavea', 'la iberica', 'papa johns'
-            ],
-            'Compras': [
-                'ripley', 'saga falabella', 'oechsle', 'linio', 'mercadolibre',
-                'coolbox', 'hiraoka', 'casaideas', 'miniso', 'curacao'
-            ],
-            'Entretenimiento': [
-                'cineplanet', 'cinépolis', 'netflix', 'spotify', 'joinnus',
-                'teleticket', 'epic games', 'steam', 'claro video', 'disney plus'
-            ],
-            'Vivienda': [
-                'pacifico seguros', 'rimac seguros', 'la positiva', 'los portales',
-                'decor center', 'decorlux', 'sodimac', 'promart', 'ferretti',
-                'cassinelli'
-            ],
-            'Otros': [
-                'serpost', 'sunat', 'reniec', 'essalud', 'inkafarma',
-                'boticas peru', 'western union', 'claro peru', 'entel peru',
-                'movistar peru'
-            ]
+        # Existing (category_id, keyword) pairs, so re-seeding skips what is already there
+        existing = {
+            (category_id, keyword_text)
+            for category_id, keyword_text in self.db.query(CategoryKeyword.category_id, CategoryKeyword.keyword).filter(
+                CategoryKeyword.user_id == user_id
+            )
         }
         
+        new_rows = []
         for category in categories:
-            if category.name in default_keywords:
-                keywords_to_add = default_keywords[category.name]
-                
-                for keyword_text in keywords_to_add:
-                    try:
-                        self.add_keyword(
-                            user_id=user_id,
-                            category_id=str(category.id),
-                            keyword=keyword_text,
-                            description=f"Palabra clave por defecto para {category.name}"
-                        )
-                    except ValueError:
-                        # Keyword already exists, skip
-                        continue
+            for keyword_text in _DEFAULT_KEYWORDS.get(category.name, ()):
+                if (category.id, keyword_text) in existing:
+                    continue
+                existing.add((category.id, keyword_text))
+                new_rows.append({
+                    "user_id": category.user_id,
+                    "category_id": category.id,
+                    "keyword": keyword_text,
+                    "description": f"Palabra clave por defecto para {category.name}"
+                })
+        
+        if new_rows:
+            # One batched INSERT and a single commit for the whole seed
+            if self.db.get_bind().dialect.name == "postgresql":
+                # Rows a concurrent seed inserted since the lookup above are skipped by the unique index
+                self.db.execute(
+                    pg_insert(CategoryKeyword).on_conflict_do_nothing(
+                        index_elements=["user_id", "category_id", "keyword"]
+                    ),
+                    new_rows
+                )
+            else:
+                self.db.bulk_insert_mappings(CategoryKeyword, new_rows)
+            self.db.commit()
+            invalidate_keyword_index(user_id)
@@ -1,17 +1,90 @@
 from typing import Optional
 from dataclasses import dataclass
+import asyncio
+import random
+import time
 import httpx
 from app.core.config import settings
 import logging
 import re
 
+try:
+    import orjson
+except ImportError:  # Fall back to httpx's stdlib json decoding
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 TEST_BUYER_REGEX = re.compile(r"^test_user_\d+@testuser\.com$")
 
+# Checkout outcomes Mercado Pago redirects back to the dashboard with
+_BACK_URL_STATUSES = ("success", "failure", "pending")
+
 PRODUCTION_API = "https://api.mercadopago.com"
 SANDBOX_API = "https://api.mercadopago.com"
 
+# Connection pool shared by every service instance using the configured access token, so
+# requests reuse keep-alive TLS connections instead of handshaking per call
+_shared_client: Optional[httpx.AsyncClient] = None
+_SHARED_CLIENT_LIMITS = httpx.Limits(max_connections=50, max_keepalive_connections=20)
+_CLIENT_TIMEOUT = httpx.Timeout(connect=2.0, read=8.0, write=4.0, pool=2.0)
+
+# Transient failures (connection errors, 5xx) are retried with jittered exponential backoff
+_MAX_ATTEMPTS = 3
+_BACKOFF_BASE_SECONDS = 0.2
+_BACKOFF_MAX_SECONDS = 2.0
+# Connection failures that guarantee the request never reached Mercado Pago, so even
+# non-idempotent POSTs can be resent
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+# Circuit breaker: after this many consecutive failed calls, fail fast for a while instead of
+# tying up workers on an API that is down
+_BREAKER_FAIL_MAX = 10
+_BREAKER_RESET_SECONDS = 30.0
+_consecutive_failures = 0
+_circuit_open_until = 0.0
+
+
+class MercadoPagoUnavailableError(httpx.TransportError):
+    """Raised without calling the API while the circuit breaker is open"""
+
+
+def _record_result(success: bool) -> None:
+    global _consecutive_failures, _circuit_open_until
+    if success:
+        _consecutive_failures = 0
+        return
+    _consecutive_failures += 1
+    if _consecutive_failures >= _BREAKER_FAIL_MAX:
+        _circuit_open_until = time.monotonic() + _BREAKER_RESET_SECONDS
+        logger.error(f"Mercado Pago circuit opened after {_consecutive_failures} consecutive failures")
+
+
+def _decode_json(resp: httpx.Response):
+    """Decode a JSON response body straight from bytes with orjson when available"""
+    if orjson is not None:
+        return orjson.loads(resp.content)
+    return resp.json()
+
+
+def _backoff_seconds(attempt: int) -> float:
+    return random.uniform(0, min(_BACKOFF_MAX_SECONDS, _BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+
+def _build_client(base_api: str, access_token: str, **kwargs) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url=base_api, headers={
+        "Authorization": f"Bearer {access_token}",
+        "Content-Type": "application/json"
+    }, timeout=_CLIENT_TIMEOUT, **kwargs)
+
+
+async def close_shared_client():
+    """Close the shared Mercado Pago connection pool (called on application shutdown)"""
+    global _shared_client
+    if _shared_client is not None:
+        await _shared_client.aclose()
+        _shared_client = None
+
 @dataclass
 class PreferenceItem:
     title: str
@@ -31,16 +104,50 @@ class MercadoPagoService:
                         is_test_mode)
         base_api = SANDBOX_API if is_test_token else PRODUCTION_API
 
-        logger.info(f"MercadoPago initialized with {'TEST' if is_test_token else 'PRODUCTION'} credentials")
-        logger.info(f"Token prefix: {self.access_token[:10]}...")
-        logger.info(f"Using API base: {base_api}")
+        global _shared_client
+        # Only the configured token uses the shared pool; explicit tokens get a client of their own.
+        # The pool is built on first use, and instances that reuse it skip client setup and logging.
+        self._owns_client = self.access_token != settings.MP_ACCESS_TOKEN
+        builds_client = self._owns_client or _shared_client is None or _shared_client.is_closed
+        if self._owns_client:
+            self._client = _build_client(base_api, self.access_token)
+        else:
+            if builds_client:
+                _shared_client = _build_client(base_api, self.access_token, limits=_SHARED_CLIENT_LIMITS)
+            self._client = _shared_client
 
-        self._client = httpx.AsyncClient(base_url=base_api, headers={
-            "Authorization": f"Bearer {self.access_token}",
-            "Content-Type": "application/json"
-        })
+        if builds_client:
+            logger.info(f"MercadoPago initialized with {'TEST' if is_test_token else 'PRODUCTION'} credentials")
+            logger.info(f"Token prefix: {self.access_token[:10]}...")
+            logger.info(f"Using API base: {base_api}")
+
+    async def _request(self, method: str, url: str, json: Optional[dict] = None) -> httpx.Response:
+        """Send a request through the circuit breaker, retrying transient failures"""
+        if time.monotonic() < _circuit_open_until:
+            raise MercadoPagoUnavailableError("Mercado Pago circuit breaker is open")
+
+        idempotent = method == "GET"
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                resp = await self._client.request(method, url, json=json)
+            except httpx.TransportError as e:
+                if attempt < _MAX_ATTEMPTS and (idempotent or isinstance(e, _NOT_SENT_ERRORS)):
+                    logger.warning(f"Mercado Pago {method} {url} failed ({e!r}), retrying (attempt {attempt})")
+                    await asyncio.sleep(_backoff_seconds(attempt))
+                    continue
+                _record_result(False)
+                raise
+            if resp.status_code >= 500 and idempotent and attempt < _MAX_ATTEMPTS:
+                logger.warning(f"Mercado Pago {method} {url} returned {resp.status_code}, retrying (attempt {attempt})")
+                await asyncio.sleep(_backoff_seconds(attempt))
+                continue
+            _record_result(resp.status_code < 500)
+            return resp
 
     async def create_preference(self, items: list[PreferenceItem], payer_email: Optional[str] = None, metadata: Optional[dict] = None):
+        metadata = metadata or {}
+        back_url_prefix = f"{settings.FRONTEND_URL}/dashboard?payment="
+        plan_query = f"&plan={metadata.get('plan', 'unknown')}"
         payload = {
             "items": [
                 {
@@ -50,7 +157,7 @@ class MercadoPagoService:
                     "currency_id": it.currency_id,
                 } for it in items
             ],
-            "metadata": metadata or {},
+            "metadata": metadata,
             "payment_methods": {
                 "excluded_payment_types": [
                     {"id": "ticket"},
@@ -60,16 +167,15 @@ class MercadoPagoService:
             },
             "binary_mode": True,
             "back_urls": {
-                "success": settings.FRONTEND_URL + "/dashboard?payment=success&plan=" + metadata.get("plan", "unknown"),
-                "failure": settings.FRONTEND_URL + "/dashboard?payment=failure&plan=" + metadata.get("plan", "unknown"),
-                "pending": settings.FRONTEND_URL + "/dashboard?payment=pending&plan=" + metadata.get("plan", "unknown"),
+                status: back_url_prefix + status + plan_query
+                for status in _BACK_URL_STATUSES
             },
             "notification_url": "https://personal-cfo.io/api/v1/webhooks/mercadopago"
         }
         try:
-            resp = await self._client.post("/checkout/preferences", json=payload)
+            resp = await self._request("POST", "/checkout/preferences", json=payload)
             resp.raise_for_status()
-            return resp.json()
+            return _decode_json(resp)
         except httpx.HTTPStatusError as e:
             try:
                 error_detail = e.response.json()
@@ -79,27 +185,29 @@ class MercadoPagoService:
             raise
 
     async def get_preference(self, preference_id: str):
-        resp = await self._client.get(f"/checkout/preferences/{preference_id}")
+        resp = await self._request("GET", f"/checkout/preferences/{preference_id}")
         resp.raise_for_status()
-        return resp.json()
+        return _decode_json(resp)
 
     async def get_payment(self, payment_id: str):
-        resp = await self._client.get(f"/v1/payments/{payment_id}")
+        resp = await self._request("GET", f"/v1/payments/{payment_id}")
         resp.raise_for_status()
-        return resp.json()
+        return _decode_json(resp)
 
     async def get_preapproval(self, preapproval_id: str):
-        resp = await self._client.get(f"/preapproval/{preapproval_id}")
+        resp = await self._request("GET", f"/preapproval/{preapproval_id}")
         resp.raise_for_status()
-        return resp.json()
+        return _decode_json(resp)
 
     async def create_preapproval(self, payload: dict):
-        resp = await self._client.post("/preapproval", json=payload)
+        resp = await self._request("POST", "/preapproval", json=payload)
         resp.raise_for_status()
-        return resp.json()
+        return _decode_json(resp)
 
     async def close(self):
-        await self._client.aclose()
+        # The shared pool outlives individual service instances
+        if self._owns_client:
+            await self._client.aclose()
 
 async def create_plan_checkout(plan: str, payer_email: str):
     if plan not in ("plus", "pro"):
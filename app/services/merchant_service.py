@@ -1,12 +1,70 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional, Dict, Any
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from collections import Counter, OrderedDict
+from typing import Iterable, List, Optional, Dict, Any, Tuple
+import logging
+import threading
+import time
 import uuid
 import re
 
 from app.models.merchant import Merchant
 from app.core.exceptions import NotFoundError
 
+logger = logging.getLogger(__name__)
+
+# Suffixes and location details stripped from merchant names
+_MERCHANT_SUFFIX_PATTERNS = (
+    r'\s+LIMA\s*PE.*$', r'\s+PE.*$', r'\s*\d+.*$',
+    r'\s*S\.A\.?C\.?I\.?.*$', r'\s*S\.?A\.?.*$',
+    r'\s*E\.?I\.?R\.?L\.?.*$', r'\s*S\.?A\.?C\.?.*$',
+    r'\s*S\.?R\.?L\.?.*$', r'\s*INC\.?.*$', r'\s*LLC\.?.*$',
+)
+# Every alternative runs to the end of a single-line name, so one pass with the alternation
+# equals applying the patterns one by one; multi-line names keep the sequential passes
+_MERCHANT_SUFFIX_RE = re.compile('|'.join(_MERCHANT_SUFFIX_PATTERNS), re.IGNORECASE)
+_MERCHANT_SUFFIX_RES = tuple(re.compile(pattern, re.IGNORECASE) for pattern in _MERCHANT_SUFFIX_PATTERNS)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# Common brand standardizations; when several apply, the lowest rank wins.
+# Prefix brands: lowercased first word -> (rank, required start of the remaining words, brand);
+# they only apply when more words follow the brand.
+_PREFIX_BRANDS = {
+    'makro': (0, '', 'Makro'),
+    'metro': (1, '', 'Metro'),
+    'wong': (2, '', 'Wong'),
+    'ripley': (3, '', 'Ripley'),
+    'falabella': (4, '', 'Falabella'),
+    'tottus': (5, '', 'Tottus'),
+    'plaza': (6, 'vea ', 'Plaza Vea'),
+    'vivanda': (7, '', 'Vivanda'),
+    'openai': (8, '', 'OpenAI'),
+    'amazon': (10, '', 'Amazon'),
+    'netflix': (11, '', 'Netflix'),
+}
+# Letters that case-insensitive regex matching treats as ASCII s/i but str.lower() keeps
+_BRAND_CASE_FOLD = str.maketrans({'ſ': 's', 'ı': 'i', 'İ': 'i'})
+# Substring brands: (rank, lowercased text anywhere in the name, brand)
+_SUBSTRING_BRANDS = (
+    (9, 'steam', 'Steam'),
+    (12, 'directv', 'DirectTV'),
+    (13, 'direct tv', 'DirectTV'),
+    (14, 'cad directv', 'DirectTV'),
+)
+
+# Formatted AI-prompt merchant lists per user, reused for a short time. Writes in this process
+# drop the user's entry; the TTL bounds staleness from writes made by other workers.
+_PROMPT_CACHE_TTL_SECONDS = 60
+_PROMPT_CACHE_SIZE = 4096
+_prompt_cache: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+_prompt_cache_lock = threading.Lock()
+
+
+def _invalidate_prompt_cache(user_id) -> None:
+    with _prompt_cache_lock:
+        _prompt_cache.pop(str(user_id), None)
+
 class MerchantService:
     
     @staticmethod
@@ -17,8 +75,12 @@ class MerchantService:
     @staticmethod
     def get_merchant_names(db: Session, user_id: uuid.UUID) -> List[str]:
         """Get list of canonical merchant names for a user"""
-        merchants = db.query(Merchant.canonical_name).filter(Merchant.user_id == user_id).all()
-        return [m.canonical_name for m in merchants]
+        # Scalar column read in a stable order, so the prompt built from it is deterministic
+        return db.execute(
+            select(Merchant.canonical_name)
+            .where(Merchant.user_id == user_id)
+            .order_by(Merchant.canonical_name)
+        ).scalars().all()
     
     @staticmethod
     def merchant_exists(db: Session, user_id: uuid.UUID, merchant_name: str) -> bool:
@@ -46,10 +108,11 @@ class MerchantService:
             canonical_name=canonical_name,
             display_name=canonical_name,
             category=category,
-            transaction_count="1"
+            transaction_count=1
         )
         
         db.add(merchant)
+        _invalidate_prompt_cache(user_id)
         return merchant
     
     @staticmethod
@@ -62,58 +125,70 @@ class MerchantService:
         name = name.strip().title()
         
         # Remove common suffixes and location details
-        patterns_to_remove = [
-            r'\s+LIMA\s*PE.*$', r'\s+PE.*$', r'\s*\d+.*$', 
-            r'\s*S\.A\.?C\.?I\.?.*$', r'\s*S\.?A\.?.*$',
-            r'\s*E\.?I\.?R\.?L\.?.*$', r'\s*S\.?A\.?C\.?.*$',
-            r'\s*S\.?R\.?L\.?.*$', r'\s*INC\.?.*$', r'\s*LLC\.?.*$'
-        ]
-        
-        for pattern in patterns_to_remove:
-            name = re.sub(pattern, '', name, flags=re.IGNORECASE)
+        if '\n' in name:
+            for pattern in _MERCHANT_SUFFIX_RES:
+                name = pattern.sub('', name)
+        else:
+            name = _MERCHANT_SUFFIX_RE.sub('', name)
         
         # Remove extra whitespace
-        name = re.sub(r'\s+', ' ', name).strip()
+        name = _WHITESPACE_RE.sub(' ', name).strip()
         
-        # Common brand standardizations
-        brand_mappings = {
-            r'^MAKRO\s+': 'Makro',
-            r'^METRO\s+': 'Metro',
-            r'^WONG\s+': 'Wong',
-            r'^RIPLEY\s+': 'Ripley',
-            r'^FALABELLA\s+': 'Falabella',
-            r'^TOTTUS\s+': 'Tottus',
-            r'^PLAZA\s+VEA\s+': 'Plaza Vea',
-            r'^VIVANDA\s+': 'Vivanda',
-            r'^OPENAI\s+': 'OpenAI',
-            r'STEAM': 'Steam',
-            r'^AMAZON\s+': 'Amazon',
-            r'^NETFLIX\s+': 'Netflix',
-            r'DIRECTV': 'DirectTV',
-            r'DIRECT TV': 'DirectTV',
-            r'CAD DIRECTV': 'DirectTV',
-        }
-        
-        for pattern, replacement in brand_mappings.items():
-            if re.search(pattern, name, re.IGNORECASE):
-                name = replacement
+        # Common brand standardizations: one dict lookup on the first word plus a few
+        # substring checks, instead of a regex search per brand
+        lowered = name.translate(_BRAND_CASE_FOLD).lower()
+        best = None
+        head, separator, rest = lowered.partition(' ')
+        prefix_brand = _PREFIX_BRANDS.get(head) if separator else None
+        if prefix_brand and rest.startswith(prefix_brand[1]):
+            best = (prefix_brand[0], prefix_brand[2])
+        for rank, text, brand in _SUBSTRING_BRANDS:
+            if best is not None and rank > best[0]:
+                break
+            if text in lowered:
+                best = (rank, brand)
                 break
+        if best is not None:
+            name = best[1]
         
         return name
     
+    @staticmethod
+    def standardize_batch(names: Iterable[str]) -> List[str]:
+        """Standardize many merchant names, running the rules once per distinct name"""
+        standardized: Dict[Optional[str], str] = {}
+        result = []
+        for name in names:
+            canonical = standardized.get(name)
+            if canonical is None:
+                canonical = standardized[name] = MerchantService._standardize_merchant_name(name)
+            result.append(canonical)
+        return result
+    
     @staticmethod
     def get_merchants_for_ai_prompt(db: Session, user_id: uuid.UUID) -> str:
         """Get formatted merchant list for AI prompt"""
-        merchants = MerchantService.get_user_merchants(db, user_id)
+        cache_key = str(user_id)
+        now = time.monotonic()
+        with _prompt_cache_lock:
+            cached = _prompt_cache.get(cache_key)
+            if cached is not None and cached[0] > now:
+                _prompt_cache.move_to_end(cache_key)
+                return cached[1]
         
-        if not merchants:
-            return "No existing merchants found. AI should standardize new merchant names using common brand names."
+        merchant_names = MerchantService.get_merchant_names(db, user_id)
         
-        merchant_list = []
-        for merchant in merchants:
-            merchant_list.append(f"- {merchant.canonical_name}")
+        if not merchant_names:
+            prompt = "No existing merchants found. AI should standardize new merchant names using common brand names."
+        else:
+            prompt = "\n".join(f"- {name}" for name in merchant_names)
         
-        return "\n".join(merchant_list)
+        with _prompt_cache_lock:
+            _prompt_cache[cache_key] = (now + _PROMPT_CACHE_TTL_SECONDS, prompt)
+            _prompt_cache.move_to_end(cache_key)
+            while len(_prompt_cache) > _PROMPT_CACHE_SIZE:
+                _prompt_cache.popitem(last=False)
+        return prompt
     
     @staticmethod
     def process_ai_merchant(db: Session, user_id: uuid.UUID, ai_merchant_name: str, 
@@ -124,23 +199,63 @@ class MerchantService:
             
         # Standardize the AI-provided merchant name
         standardized_name = MerchantService._standardize_merchant_name(ai_merchant_name)
+        MerchantService._record_merchant(db, user_id, standardized_name, category)
+
+    @staticmethod
+    def _record_merchant(db: Session, user_id: uuid.UUID, standardized_name: str,
+                         category: Optional[str] = None, occurrences: int = 1):
+        """Add the merchant if it does not exist, otherwise bump its transaction count"""
+        if db.get_bind().dialect.name == "postgresql":
+            MerchantService._upsert_merchant(db, user_id, standardized_name, category, occurrences)
+            return
         
-        # Check if merchant already exists
-        if not MerchantService.merchant_exists(db, user_id, standardized_name):
+        # Bump the count in place; only a merchant that matched no row gets created
+        result = db.execute(
+            update(Merchant)
+            .where(
+                Merchant.user_id == user_id,
+                func.lower(Merchant.canonical_name) == func.lower(standardized_name)
+            )
+            .values(transaction_count=Merchant.transaction_count + occurrences)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            db.commit()
+            logger.debug("Updated transaction count for: %s", standardized_name)
+        else:
             # Create new merchant
-            MerchantService.create_merchant(db, user_id, standardized_name, category)
+            merchant = MerchantService.create_merchant(db, user_id, standardized_name, category)
+            merchant.transaction_count = occurrences
             db.commit()
-            print(f"✅ Added new merchant: {standardized_name}")
+            logger.debug("Added new merchant: %s", standardized_name)
+
+    @staticmethod
+    def _upsert_merchant(db: Session, user_id: uuid.UUID, standardized_name: str,
+                         category: Optional[str] = None, occurrences: int = 1):
+        """Insert the merchant or bump its transaction count in a single INSERT ... ON CONFLICT"""
+        stmt = pg_insert(Merchant).values(
+            id=uuid.uuid4(),
+            user_id=user_id,
+            canonical_name=standardized_name,
+            display_name=standardized_name,
+            category=category,
+            transaction_count=occurrences
+        )
+        # xmax is 0 only on a freshly inserted row version, never on one updated by ON CONFLICT
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Merchant.user_id, func.lower(Merchant.canonical_name)],
+            set_={
+                "transaction_count": Merchant.transaction_count + occurrences,
+                "updated_at": func.now(),
+            }
+        ).returning(literal_column("xmax = 0").label("inserted"))
+        inserted = db.execute(stmt).scalar()
+        db.commit()
+        if inserted:
+            _invalidate_prompt_cache(user_id)
+            logger.debug("Added new merchant: %s", standardized_name)
         else:
-            # Update transaction count for existing merchant
-            merchant = db.query(Merchant).filter(
-                Merchant.user_id == user_id,
-                func.lower(Merchant.canonical_name) == func.lower(standardized_name)
-            ).first()
-            if merchant:
-                merchant.transaction_count = str(int(merchant.transaction_count or "0") + 1)
-                db.commit()
-                print(f"✅ Updated transaction count for: {standardized_name}")
+            logger.debug("Updated transaction count for: %s", standardized_name)
 
     @staticmethod
     def learn_from_transaction(db: Session, user_id: uuid.UUID, raw_merchant: str, 
@@ -153,4 +268,16 @@ class MerchantService:
             return
             
         # Process the AI-provided merchant name
-        MerchantService.process_ai_merchant(db, user_id, standardized_merchant, category)
\ No newline at end of file
+        MerchantService.process_ai_merchant(db, user_id, standardized_merchant, category)
+
+    @staticmethod
+    def learn_from_transactions(db: Session, user_id: uuid.UUID, standardized_merchants: Iterable[str],
+                                category: Optional[str] = None):
+        """
+        Learn from a batch of transactions at once: each distinct merchant is standardized
+        once and written once, with its transaction count bumped by its number of occurrences
+        """
+        merchant_names = [name for name in standardized_merchants if name and name.strip()]
+        occurrences = Counter(MerchantService.standardize_batch(merchant_names))
+        for standardized_name, count in occurrences.items():
+            MerchantService._record_merchant(db, user_id, standardized_name, category, count)
@@ -2,16 +2,104 @@
 Enhanced PDF Service for handling password-protected PDFs with multiple library fallbacks
 """
 
+import hashlib
 import io
 import logging
-from typing import Optional, Tuple, Dict, Any
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Dict, Any, List
 import PyPDF2
 import fitz  # PyMuPDF
+import pypdfium2 as pdfium
 import pdfplumber
 import pikepdf  # QPDF-backed
 
 logger = logging.getLogger(__name__)
 
+# Recently extracted texts keyed by sha256 of (content, password); re-uploads skip extraction
+_TEXT_CACHE_SIZE = 32
+_text_cache: "OrderedDict[str, str]" = OrderedDict()
+_text_cache_lock = threading.Lock()
+
+# Raw byte markers checked by the manual encryption fallback
+_ENCRYPTION_MARKERS = (
+    b'/Encrypt',
+    b'/Filter /Standard',
+    b'/Filter/Standard',
+    b'endobj\n/Encrypt',
+    b'/O <',
+    b'/U <',
+    b'/CF',
+    b'/StdCF',
+    b'/SecurityHandler',
+    b'/R 4',
+    b'/R 5',
+    b'/R 6',
+)
+
+
+def _text_cache_key(file_content: bytes, password: Optional[str]) -> str:
+    digest = hashlib.sha256(file_content)
+    if password:
+        digest.update(b"\0" + password.encode("utf-8"))
+    return digest.hexdigest()
+
+
+# Documents with at least this many pages have their text extracted in worker processes
+_PARALLEL_PAGE_THRESHOLD = 16
+_MAX_PAGE_WORKERS = 4
+# Upper bound on waiting for the workers; past it the pool is discarded and pages are read inline
+_PAGE_EXTRACTION_TIMEOUT_SECONDS = 120
+
+# Long-lived page extraction workers, created on first use. Spawned rather than forked: the
+# API and Celery processes are multi-threaded, and forking them can deadlock the child.
+_page_pool: Optional[ProcessPoolExecutor] = None
+_page_pool_lock = threading.Lock()
+
+
+def _get_page_pool() -> ProcessPoolExecutor:
+    global _page_pool
+    with _page_pool_lock:
+        if _page_pool is None:
+            _page_pool = ProcessPoolExecutor(
+                max_workers=_MAX_PAGE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _page_pool
+
+
+def shutdown_page_pool() -> None:
+    """Stop the page extraction workers (called on application shutdown)"""
+    global _page_pool
+    with _page_pool_lock:
+        pool, _page_pool = _page_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _read_pdfium_pages(pdf, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) of an open pypdfium2 document"""
+    page_texts = []
+    for index in range(start, stop):
+        page = pdf[index]
+        textpage = page.get_textpage()
+        page_texts.append(textpage.get_text_bounded())
+        textpage.close()
+        page.close()
+    return page_texts
+
+
+def _extract_pdfium_pages(file_content: bytes, password: Optional[str], start: int, stop: int) -> List[str]:
+    """Extract the text of pages [start, stop); pdfium handles are not picklable, so reopen from bytes"""
+    pdf = pdfium.PdfDocument(file_content, password=password)
+    try:
+        return _read_pdfium_pages(pdf, start, stop)
+    finally:
+        pdf.close()
+
 
 class PDFService:
     """Enhanced service for handling PDF operations with multiple library fallbacks"""
@@ -275,26 +363,11 @@ class PDFService:
 
         # Method 4: Manual detection as final fallback
         try:
-            content_str = file_content.decode('latin-1', errors='ignore')
-            encryption_indicators = [
-                '/Encrypt',
-                '/Filter /Standard',
-                '/Filter/Standard',
-                'endobj\n/Encrypt',
-                '/O <',
-                '/U <',
-                '/CF',
-                '/StdCF',
-                '/SecurityHandler',
-                '/R 4',
-                '/R 5',
-                '/R 6'
-            ]
-
-            for indicator in encryption_indicators:
-                if indicator in content_str:
-                    methods_tried.append(f"Manual: found '{indicator}'")
-                    logger.info(f"Manual encryption detection: Found indicator '{indicator}'")
+            # Search the raw bytes instead of decoding a full string copy of the document
+            for indicator in _ENCRYPTION_MARKERS:
+                if indicator in file_content:
+                    methods_tried.append(f"Manual: found '{indicator.decode()}'")
+                    logger.info(f"Manual encryption detection: Found indicator '{indicator.decode()}'")
                     return True
             methods_tried.append("Manual: no indicators found")
         except Exception as e:
@@ -627,11 +700,47 @@ class PDFService:
             return False, b"", f"pdfplumber unlock failed: {str(e)}"
         return False, b"", "pdfplumber could not open PDF with password"
 
+    @staticmethod
+    def _extract_text_with_pdfium(file_content: bytes, password: Optional[str] = None) -> str:
+        """Extract plain page text with pypdfium2, skipping layout analysis"""
+        workers = min(os.cpu_count() or 1, _MAX_PAGE_WORKERS)
+        pdf = pdfium.PdfDocument(file_content, password=password)
+        try:
+            page_count = len(pdf)
+            if page_count < _PARALLEL_PAGE_THRESHOLD or workers < 2:
+                # Short documents are read from the handle already open instead of parsing the bytes again
+                return "\n".join(_read_pdfium_pages(pdf, 0, page_count))
+        finally:
+            pdf.close()
+
+        # One contiguous page range per worker keeps the PDF bytes sent to each process to one copy
+        step = -(-page_count // workers)
+        bounds = [(start, min(start + step, page_count)) for start in range(0, page_count, step)]
+        futures = []
+        try:
+            pool = _get_page_pool()
+            futures = [
+                pool.submit(_extract_pdfium_pages, file_content, password, start, stop)
+                for start, stop in bounds
+            ]
+            chunks = [future.result(timeout=_PAGE_EXTRACTION_TIMEOUT_SECONDS) for future in futures]
+        except Exception as e:
+            logger.warning(f"Parallel pypdfium2 extraction failed, extracting sequentially: {e!r}")
+            for future in futures:
+                future.cancel()
+            # A broken or stuck pool would fail every later document too; start fresh next time
+            shutdown_page_pool()
+            return "\n".join(_extract_pdfium_pages(file_content, password, 0, page_count))
+        return "\n".join(text for chunk in chunks for text in chunk)
+
     @staticmethod
     def extract_text_from_pdf(file_content: bytes, password: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
         """
         Extract text content from a PDF file using multiple libraries
 
+        Successful extractions are kept in a small in-process LRU cache keyed by
+        the content hash, so reprocessing the same file skips the PDF libraries.
+
         Args:
             file_content: PDF file content as bytes
             password: Optional password if PDF is encrypted
@@ -639,21 +748,52 @@ class PDFService:
         Returns:
             Tuple of (success: bool, text_content: Optional[str], error: Optional[str])
         """
+        cache_key = _text_cache_key(file_content, password)
+        with _text_cache_lock:
+            cached = _text_cache.get(cache_key)
+            if cached is not None:
+                _text_cache.move_to_end(cache_key)
+        if cached is not None:
+            logger.info(f"PDF text cache hit: length={len(cached)}")
+            return True, cached, None
+
+        success, text_content, error = PDFService._extract_text_uncached(file_content, password)
+        if success and text_content:
+            with _text_cache_lock:
+                _text_cache[cache_key] = text_content
+                _text_cache.move_to_end(cache_key)
+                while len(_text_cache) > _TEXT_CACHE_SIZE:
+                    _text_cache.popitem(last=False)
+        return success, text_content, error
+
+    @staticmethod
+    def _extract_text_uncached(file_content: bytes, password: Optional[str] = None) -> Tuple[bool, Optional[str], Optional[str]]:
+        """Run the library fallback chain for extract_text_from_pdf"""
         # 0) If a password is provided, first try to extract text directly with password (no unlock step)
         if password:
+            # Try pypdfium2 first: plain text without layout analysis
+            try:
+                text_content = PDFService._extract_text_with_pdfium(file_content, password)
+                if text_content.strip():
+                    logger.info(f"pypdfium2 (password) extracted text: length={len(text_content)}")
+                    return True, text_content, None
+            except Exception as e:
+                logger.warning(f"pypdfium2 text extraction with password failed: {str(e)}")
+
             # Try PyMuPDF by opening then authenticating
             try:
                 doc = fitz.open(stream=file_content, filetype="pdf")
                 if getattr(doc, "needs_pass", False):
                     if doc.authenticate(password):
                         page_count = len(doc)
-                        text_content = ""
+                        page_texts = []
                         for page in doc:
                             try:
-                                text_content += page.get_text() + "\n"
+                                page_texts.append(page.get_text())
                             except Exception as pe:
                                 logger.warning(f"PyMuPDF (authenticate) page text error: {pe}")
                         doc.close()
+                        text_content = "\n".join(page_texts)
                         if text_content.strip():
                             logger.info(f"PyMuPDF (authenticate) extracted text: pages={page_count}, length={len(text_content)}")
                             return True, text_content, None
@@ -669,14 +809,15 @@ class PDFService:
             # Try pdfplumber with password
             try:
                 with pdfplumber.open(io.BytesIO(file_content), password=password) as pdf:
-                    text_content = ""
+                    page_texts = []
                     for page in pdf.pages:
                         try:
                             page_text = page.extract_text()
                             if page_text:
-                                text_content += page_text + "\n"
+                                page_texts.append(page_text)
                         except Exception as pe:
                             logger.warning(f"pdfplumber (password) page text error: {pe}")
+                    text_content = "\n".join(page_texts)
                     if text_content.strip():
                         logger.info(f"pdfplumber (password) extracted text: pages={len(pdf.pages)}, length={len(text_content)}")
                         return True, text_content, None
@@ -690,14 +831,15 @@ class PDFService:
                 if pdf_reader.is_encrypted:
                     decrypt_result = pdf_reader.decrypt(password)
                     if decrypt_result in (1, True):
-                        text_content = ""
+                        page_texts = []
                         for page in pdf_reader.pages:
                             try:
                                 page_text = page.extract_text()
                                 if page_text:
-                                    text_content += page_text + "\n"
+                                    page_texts.append(page_text)
                             except Exception as pe:
                                 logger.warning(f"PyPDF2 (password) page text error: {pe}")
+                        text_content = "\n".join(page_texts)
                         if text_content.strip():
                             logger.info(f"PyPDF2 (password) extracted text: pages={len(pdf_reader.pages)}, length={len(text_content)}")
                             return True, text_content, None
@@ -723,56 +865,68 @@ class PDFService:
             else:
                 return False, None, f"Failed to unlock PDF: {unlock_error}"
 
-        # 2) Try PyMuPDF without password (on unlocked or original content)
+        # 2) Try pypdfium2 without password (fastest plain-text extraction)
+        try:
+            text_content = PDFService._extract_text_with_pdfium(file_content)
+            if text_content.strip():
+                logger.info(f"pypdfium2 extracted text: length={len(text_content)}")
+                return True, text_content, None
+        except Exception as e:
+            logger.warning(f"pypdfium2 text extraction failed: {str(e)}")
+
+        # 3) Try PyMuPDF without password (on unlocked or original content)
         try:
             doc = fitz.open(stream=file_content, filetype="pdf")
-            text_content = ""
+            page_texts = []
             for page in doc:
                 try:
-                    text_content += page.get_text() + "\n"
+                    page_texts.append(page.get_text())
                 except Exception as pe:
                     logger.warning(f"PyMuPDF page text error: {pe}")
             page_count = len(doc)
             doc.close()
 
+            text_content = "\n".join(page_texts)
             if text_content.strip():
                 logger.info(f"PyMuPDF extracted text: pages={page_count}, length={len(text_content)}")
                 return True, text_content, None
         except Exception as e:
             logger.warning(f"PyMuPDF text extraction failed: {str(e)}")
 
-        # 3) Try pdfplumber without password
+        # 4) Try pdfplumber without password
         try:
             with pdfplumber.open(io.BytesIO(file_content)) as pdf:
-                text_content = ""
+                page_texts = []
                 for page in pdf.pages:
                     try:
                         page_text = page.extract_text()
                         if page_text:
-                            text_content += page_text + "\n"
+                            page_texts.append(page_text)
                     except Exception as pe:
                         logger.warning(f"pdfplumber page text error: {pe}")
 
+                text_content = "\n".join(page_texts)
                 if text_content.strip():
                     logger.info(f"pdfplumber extracted text: pages={len(pdf.pages)}, length={len(text_content)}")
                     return True, text_content, None
         except Exception as e:
             logger.warning(f"pdfplumber text extraction failed: {str(e)}")
 
-        # 4) Try PyPDF2 as last resort
+        # 5) Try PyPDF2 as last resort
         try:
             pdf_file = io.BytesIO(file_content)
             pdf_reader = PyPDF2.PdfReader(pdf_file)
-            text_content = ""
+            page_texts = []
 
             for page in pdf_reader.pages:
                 try:
                     page_text = page.extract_text()
                     if page_text:
-                        text_content += page_text + "\n"
+                        page_texts.append(page_text)
                 except Exception as pe:
                     logger.warning(f"PyPDF2 page text error: {pe}")
 
+            text_content = "\n".join(page_texts)
             if text_content.strip():
                 logger.info(f"PyPDF2 extracted text: pages={len(pdf_reader.pages)}, length={len(text_content)}")
                 return True, text_content, None
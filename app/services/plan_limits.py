@@ -1,4 +1,5 @@
 from fastapi import HTTPException, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.models.card import Card
@@ -47,6 +48,25 @@ def _limit(plan: str, key: str):
 LIMITED_RESOURCES = ["cards", "statements", "budgets", "alerts", "categories"]
 
 
+_RESOURCE_MODELS = {
+    "cards": Card,
+    "statements": Statement,
+    "budgets": Budget,
+    "alerts": Alert,
+    "categories": Category,
+}
+
+
+def _usage_count(resource: str, user_id):
+    """Scalar COUNT subquery of the user's current usage of a limited resource"""
+    model = _RESOURCE_MODELS[resource]
+    query = select(func.count(model.id)).where(model.user_id == user_id)
+    if resource == "categories":
+        # Only count custom (non-default) user categories toward plan limits
+        query = query.where(Category.is_default == False)
+    return query.scalar_subquery()
+
+
 def _plan_key(user: User) -> str:
     """Return the string key for the user's plan (e.g. 'free', 'plus').
     Supports SQLAlchemy Enum instances by unwrapping `.value`.
@@ -65,22 +85,7 @@ def assert_within_limit(db: Session, user: User, resource: str):
         return  # unlimited
 
     # Count current usage
-    if resource == "cards":
-        count = db.query(Card).filter(Card.user_id == user.id).count()
-    elif resource == "statements":
-        count = db.query(Statement).filter(Statement.user_id == user.id).count()
-    elif resource == "budgets":
-        count = db.query(Budget).filter(Budget.user_id == user.id).count()
-    elif resource == "alerts":
-        count = db.query(Alert).filter(Alert.user_id == user.id).count()
-    elif resource == "categories":
-        # Only count custom (non-default) user categories toward plan limits
-        count = db.query(Category).filter(
-            Category.user_id == user.id,
-            Category.is_default == False
-        ).count()
-    else:
-        return
+    count = db.execute(select(_usage_count(resource, user.id))).scalar()
 
     if count >= limit:
         raise HTTPException(
@@ -101,24 +106,11 @@ def get_plan_usage(db: Session, user: User):
     if user.is_admin:
         return {r: {"current": 0, "limit": None} for r in LIMITED_RESOURCES}
     plan = _plan_key(user)
-    usage = {}
-    for r in LIMITED_RESOURCES:
-        limit = _limit(plan, r)
-        if r == "cards":
-            current = db.query(Card).filter(Card.user_id == user.id).count()
-        elif r == "statements":
-            current = db.query(Statement).filter(Statement.user_id == user.id).count()
-        elif r == "budgets":
-            current = db.query(Budget).filter(Budget.user_id == user.id).count()
-        elif r == "alerts":
-            current = db.query(Alert).filter(Alert.user_id == user.id).count()
-        elif r == "categories":
-            # Report only custom category count against the limit
-            current = db.query(Category).filter(
-                Category.user_id == user.id,
-                Category.is_default == False
-            ).count()
-        else:
-            current = 0
-        usage[r] = {"current": current, "limit": limit}
-    return usage
+    # All resource counts in a single round trip
+    counts = db.execute(
+        select(*[_usage_count(r, user.id) for r in LIMITED_RESOURCES])
+    ).one()
+    return {
+        r: {"current": current, "limit": _limit(plan, r)}
+        for r, current in zip(LIMITED_RESOURCES, counts)
+    }
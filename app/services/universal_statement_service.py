@@ -3,13 +3,14 @@ Enhanced AI-powered statement service that can process any bank statement.
 This service uses the CleanAIStatementExtractor to handle statements from any bank
 without requiring specific pattern mappings.
 """
-import json
+import io
 import logging
 import uuid
 import os
 from datetime import datetime
 from typing import List, Dict, Any, Optional
 
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
 from app.core.exceptions import ValidationError, ProcessingError
@@ -26,6 +27,30 @@ logger = logging.getLogger(__name__)
 # Constants
 DEFAULT_CATEGORY = "Sin categoría"
 MAX_RETRIES = 3
+AI_EXTRACTION_CONFIDENCE = 0.95  # High confidence for AI extraction
+COPY_THRESHOLD = 5000  # Row count above which transactions are loaded with COPY
+_COPY_COLUMNS = (
+    "id", "card_id", "statement_id", "merchant", "amount", "currency",
+    "transaction_date", "description", "category", "ai_confidence",
+)
+
+
+def _copy_text_value(value: Any) -> str:
+    """Encode a value for COPY's text format: None is NULL, everything else is escaped text"""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
+
+
+def _utf8_safe(value: Optional[str]) -> str:
+    """Drop characters that cannot be encoded as UTF-8 (e.g. lone surrogates)"""
+    return value.encode('utf-8', errors='ignore').decode('utf-8') if value else ""
 
 
 class UniversalStatementService:
@@ -46,13 +71,16 @@ and provides categorization and validation of transactions.
         statement_id: uuid.UUID,
         file_content: bytes,
         password: Optional[str] = None,
-        use_keyword_categorization: bool = True
+        use_keyword_categorization: bool = True,
+        card_id: Optional[uuid.UUID] = None
     ) -> Dict[str, Any]:
         """
         Process a statement using AI extraction and optional keyword categorization.
         AI extraction is the primary and only method for transaction extraction.
+        Transactions are created against card_id when given, otherwise against the
+        statement's card (or the user's default card).
         """
-        statement = self.db.query(Statement).filter(Statement.id == statement_id).first()
+        statement = self.db.get(Statement, statement_id)
         if not statement:
             raise ValidationError("Statement not found")
 
@@ -99,25 +127,25 @@ and provides categorization and validation of transactions.
             if use_keyword_categorization:
                 transactions_data = self._enhance_with_keywords(transactions_data, str(statement.user_id))
 
-            # Step 3: Get or create default card
-            default_card = self._get_or_create_default_card(statement)
+            # Step 3: Use the caller's card, else get or create the default card
+            default_card = self.db.get(Card, card_id) if card_id else None
+            if default_card is None:
+                default_card = self._get_or_create_default_card(statement)
 
-            # Step 4: Create Transaction objects in database
-            created_transactions = self._create_transactions(
+            # Step 4: Insert the transactions; the inserted column values come back as dicts
+            created_rows = self._create_transactions(
                 transactions_data, default_card, statement_id
             )
 
             # Step 4.5: Learn from transactions to build merchant registry
             try:
                 from app.services.merchant_service import MerchantService
-                for transaction in created_transactions:
-                    MerchantService.learn_from_transaction(
-                        db=self.db,
-                        user_id=statement.user_id,
-                        raw_merchant=transaction.description,  # Original description from statement
-                        standardized_merchant=transaction.merchant,  # AI-standardized merchant name
-                        category=None  # Will be set during categorization
-                    )
+                MerchantService.learn_from_transactions(
+                    db=self.db,
+                    user_id=statement.user_id,
+                    standardized_merchants=[row["merchant"] for row in created_rows],  # AI-standardized merchant names
+                    category=None  # Will be set during categorization
+                )
             except Exception as e:
                 logger.warning(f"Failed to learn from merchants: {str(e)}")
 
@@ -127,45 +155,37 @@ and provides categorization and validation of transactions.
             statement.categorization_status = "completed"
             statement.is_processed = True
 
-            # Store transaction summary with UTF-8 safe encoding
+            # Build the stored summary and the response rows in one pass; the
+            # stored summary is the response row without the description
             safe_transaction_data = []
-            for txn in created_transactions:
-                # Ensure all string fields are UTF-8 safe
+            response_transactions = []
+            for row in created_rows:
                 safe_txn = {
-                    "id": str(txn.id),
-                    "merchant": txn.merchant.encode('utf-8', errors='ignore').decode('utf-8') if txn.merchant else "",
-                    "amount": float(txn.amount),
-                    "currency": txn.currency,
-                    "category": txn.category.encode('utf-8', errors='ignore').decode('utf-8') if txn.category else "",
-                    "transaction_date": txn.transaction_date.isoformat()
+                    "id": str(row["id"]),
+                    "merchant": _utf8_safe(row["merchant"]),
+                    "amount": float(row["amount"]),
+                    "currency": row["currency"],
+                    "category": _utf8_safe(row["category"]),
+                    "transaction_date": row["transaction_date"].isoformat()
                 }
                 safe_transaction_data.append(safe_txn)
+                response_transactions.append({**safe_txn, "description": _utf8_safe(row["description"])})
 
-            statement.processed_transactions = json.dumps(safe_transaction_data, ensure_ascii=False)
+            # JSONB column; the engine's serializer encodes it on flush
+            statement.processed_transactions = safe_transaction_data
 
             self.db.commit()
 
             result = {
                 "statement_id": str(statement.id),
                 "status": statement.status,
-                "transactions_count": len(created_transactions),
+                "transactions_count": len(created_rows),
                 "extraction_method": "ai",
                 "keyword_enhancement": use_keyword_categorization,
-                "transactions": [
-                    {
-                        "id": str(txn.id),
-                        "merchant": txn.merchant.encode('utf-8', errors='ignore').decode('utf-8') if txn.merchant else "",
-                        "amount": float(txn.amount),
-                        "currency": txn.currency,
-                        "category": txn.category.encode('utf-8', errors='ignore').decode('utf-8') if txn.category else "",
-                        "transaction_date": txn.transaction_date.isoformat(),
-                        "description": txn.description.encode('utf-8', errors='ignore').decode('utf-8') if txn.description else ""
-                    }
-                    for txn in created_transactions
-                ]
+                "transactions": response_transactions
             }
 
-            logger.info(f"Successfully processed statement {statement_id} with {len(created_transactions)} transactions")
+            logger.info(f"Successfully processed statement {statement_id} with {len(created_rows)} transactions")
             
             # Delete statement file after successful processing
             self._delete_statement_file(statement)
@@ -176,7 +196,7 @@ and provides categorization and validation of transactions.
             # Rollback and update error status
             self.db.rollback()
 
-            statement = self.db.query(Statement).filter(Statement.id == statement_id).first()
+            statement = self.db.get(Statement, statement_id)
             if statement:
                 statement.status = "failed"
                 statement.error_message = str(e)
@@ -199,7 +219,8 @@ and provides categorization and validation of transactions.
     ) -> List[Dict[str, Any]]:
         """Extract transactions using AI (primary method)"""
         try:
-            if statement.file_type.lower() == 'pdf':
+            file_type = statement.file_type.lower()
+            if file_type == 'pdf':
                 # Use enhanced AI extraction (direct PDF processing)
                 transactions = self.ai_extractor.extract_transactions(
                     file_content,
@@ -207,7 +228,7 @@ and provides categorization and validation of transactions.
                     password
                 )
 
-            elif statement.file_type.lower() == 'csv':
+            elif file_type == 'csv':
                 # Handle CSV files
                 transactions = self.ai_extractor.extract_from_csv(
                     file_content,
@@ -236,14 +257,13 @@ and provides categorization and validation of transactions.
         try:
             enhanced_transactions = []
 
-            for txn_data in transactions_data:
-                # Try keyword categorization
-                keyword_result = self.keyword_categorization.categorize_transaction(
-                    user_id,
-                    txn_data.get('merchant', ''),
-                    txn_data.get('description', '')
-                )
+            # Load the user's keywords once and match every transaction in memory
+            keyword_results = self.keyword_categorization.categorize_many(
+                user_id,
+                [(txn_data.get('merchant', ''), txn_data.get('description', '')) for txn_data in transactions_data]
+            )
 
+            for txn_data, keyword_result in zip(transactions_data, keyword_results):
                 # Use keyword category if found (any confidence > 0)
                 if keyword_result and keyword_result.confidence > 0.0:
                     txn_data['category'] = keyword_result.category_name
@@ -264,13 +284,14 @@ and provides categorization and validation of transactions.
             return transactions_data
 
     def _get_or_create_default_card(self, statement: Statement) -> Card:
-        """Get user's card or create a default one"""
-        # Try to find an existing card for this user
-        existing_cards = self.db.query(Card).filter(Card.user_id == statement.user_id).all()
+        """Get the statement's card, else the user's first card, else create a default one"""
+        # Statement.card is joined-loaded together with the statement row
+        if statement.card is not None:
+            return statement.card
 
-        if existing_cards:
-            # Use the first available card
-            return existing_cards[0]
+        existing_card = self.db.query(Card).filter(Card.user_id == statement.user_id).first()
+        if existing_card:
+            return existing_card
 
         # Create a default card if none exists
         default_card = Card(
@@ -289,32 +310,68 @@ and provides categorization and validation of transactions.
         transactions_data: List[Dict[str, Any]],
         card: Card,
         statement_id: uuid.UUID
-    ) -> List[Transaction]:
-        """Create Transaction objects in the database"""
-        created_transactions = []
+    ) -> List[Dict[str, Any]]:
+        """Insert transactions and return the inserted rows (including their ids) as dicts"""
+        rows = []
+        card_id = card.id
 
         for txn_data in transactions_data:
             try:
-                transaction = Transaction(
-                    card_id=card.id,
-                    statement_id=statement_id,
-                    merchant=txn_data['merchant'],
-                    amount=txn_data['amount'],
-                    currency=txn_data['currency'],
-                    transaction_date=txn_data['transaction_date'],
-                    description=txn_data.get('description', txn_data['merchant']),
-                    category=txn_data.get('category', DEFAULT_CATEGORY),
-                    ai_confidence=0.95  # High confidence for AI extraction
-                )
-
-                self.db.add(transaction)
-                created_transactions.append(transaction)
-
+                rows.append(self._build_transaction_row(txn_data, card_id, statement_id))
             except Exception as e:
                 logger.warning(f"Failed to create transaction: {str(e)}")
                 continue
 
-        return created_transactions
+        if not rows:
+            return []
+
+        if len(rows) > COPY_THRESHOLD and self.db.get_bind().dialect.name == "postgresql":
+            self._copy_transactions(rows)
+        else:
+            # One executemany INSERT (batched into multi-row VALUES by SQLAlchemy)
+            self.db.execute(insert(Transaction), rows)
+
+        return rows
+
+    def _copy_transactions(self, rows: List[Dict[str, Any]]) -> None:
+        """Bulk load transaction rows with PostgreSQL COPY inside the session's transaction"""
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write("\t".join(_copy_text_value(row[column]) for column in _COPY_COLUMNS))
+            buffer.write("\n")
+        buffer.seek(0)
+
+        # The session's own DBAPI connection, so the rows commit or roll back with the statement update
+        raw_connection = self.db.connection().connection
+        with raw_connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY transactions ({', '.join(_COPY_COLUMNS)}) FROM STDIN",
+                buffer
+            )
+        logger.info(f"Bulk loaded {len(rows)} transactions with COPY")
+
+    @staticmethod
+    def _build_transaction_row(
+        txn_data: Dict[str, Any],
+        card_id: uuid.UUID,
+        statement_id: uuid.UUID
+    ) -> Dict[str, Any]:
+        """Map an extracted transaction dict onto Transaction column values"""
+        merchant = txn_data['merchant']
+        return {
+            # Primary keys are generated client-side so rows can be written without the ORM
+            # unit of work or RETURNING; callers read the ids straight from the row dicts
+            "id": uuid.uuid4(),
+            "card_id": card_id,
+            "statement_id": statement_id,
+            "merchant": merchant,
+            "amount": txn_data['amount'],
+            "currency": txn_data['currency'],
+            "transaction_date": txn_data['transaction_date'],
+            "description": txn_data.get('description', merchant),
+            "category": txn_data.get('category', DEFAULT_CATEGORY),
+            "ai_confidence": AI_EXTRACTION_CONFIDENCE,
+        }
 
     def _increment_retry_count(self, statement: Statement, retry_type: str):
         """Increment retry count for extraction or categorization"""
@@ -338,7 +395,7 @@ and provides categorization and validation of transactions.
 
     def get_statement_status(self, statement_id: uuid.UUID) -> Dict[str, Any]:
         """Get current processing status of a statement"""
-        statement = self.db.query(Statement).filter(Statement.id == statement_id).first()
+        statement = self.db.get(Statement, statement_id)
         if not statement:
             raise ValidationError("Statement not found")
 
@@ -364,7 +421,7 @@ and provides categorization and validation of transactions.
         use_keyword_categorization: bool = True
     ) -> Dict[str, Any]:
         """Retry processing a failed statement"""
-        statement = self.db.query(Statement).filter(Statement.id == statement_id).first()
+        statement = self.db.get(Statement, statement_id)
         if not statement:
             raise ValidationError("Statement not found")
 
@@ -402,11 +459,17 @@ and provides categorization and validation of transactions.
 
     def get_processing_stats(self, user_id: uuid.UUID) -> Dict[str, Any]:
         """Get processing statistics for a user"""
-        user_statements = self.db.query(Statement).filter(Statement.user_id == user_id).all()
+        # Per-status counts as lightweight row tuples instead of full Statement objects
+        status_counts = dict(
+            self.db.query(Statement.status, func.count(Statement.id))
+            .filter(Statement.user_id == user_id)
+            .group_by(Statement.status)
+            .all()
+        )
 
-        total_statements = len(user_statements)
-        completed_statements = len([s for s in user_statements if s.status == "completed"])
-        failed_statements = len([s for s in user_statements if s.status == "failed"])
+        total_statements = sum(status_counts.values())
+        completed_statements = status_counts.get("completed", 0)
+        failed_statements = status_counts.get("failed", 0)
 
         total_transactions = self.db.query(Transaction).join(Card).filter(
             Card.user_id == user_id
@@ -70,7 +70,7 @@ def process_statement_task(self, statement_id: str, user_id: str, bank_name: Opt
         # Update statement status to failed in database
         try:
             from app.models.statement import Statement
-            stmt = db.query(Statement).filter(Statement.id == uuid.UUID(statement_id)).first()
+            stmt = db.get(Statement, uuid.UUID(statement_id))
             if stmt:
                 stmt.processing_status = "failed"
                 stmt.error_message = str(e)
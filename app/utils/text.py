@@ -0,0 +1,10 @@
+import unicodedata
+
+
+def normalize_text(text: str) -> str:
+    """Lowercase, strip and remove diacritics for case/accent-insensitive matching."""
+    if not text:
+        return ""
+    text = text.strip().lower()
+    text = unicodedata.normalize("NFD", text)
+    return "".join(ch for ch in text if unicodedata.category(ch) != "Mn")
@@ -12,6 +12,8 @@ from app.core.database import engine
 from app.models import base
 from app.core.database import SessionLocal
 from app.services.seeding_service import SeedingService
+from app.services.mercado_pago_service import close_shared_client
+from app.services.pdf_service import shutdown_page_pool
 from app.core.first_admin import create_first_admin
 
 # Load environment variables
@@ -125,6 +127,14 @@ def seed_on_startup():
     finally:
         db.close()
 
+@app.on_event("shutdown")
+async def close_http_clients():
+    await close_shared_client()
+
+@app.on_event("shutdown")
+def stop_pdf_workers():
+    shutdown_page_pool()
+
 @app.get("/")
 async def root():
     return {"message": "PersonalCFO API is running"}
@@ -0,0 +1,29 @@
+import os
+
+# Settings are read at import time; give the required values harmless defaults so unit tests
+# can import the app without a .env file (real environments still override them)
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("MP_PUBLIC_KEY", "TEST-public-key")
+os.environ.setdefault("MP_ACCESS_TOKEN", "TEST-access-token")
+os.environ.setdefault("PLAN_PLUS_PRICE_PEN", "1990")
+os.environ.setdefault("PLAN_PRO_PRICE_PEN", "3990")
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401  (registers every model on Base.metadata)
+from app.core.database import Base
+
+
+@pytest.fixture
+def db_session():
+    """Session on a fresh in-memory SQLite database with every table created"""
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
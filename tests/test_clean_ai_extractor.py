@@ -0,0 +1,60 @@
+import json
+from datetime import date
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.core.exceptions import ProcessingError
+from app.services.clean_ai_extractor import CleanAIStatementExtractor, PDFService, _parse_amount
+
+
+def test_non_pdf_upload_is_rejected_without_retry_advice(monkeypatch):
+    extractor = CleanAIStatementExtractor(MagicMock())
+    extract = MagicMock()
+    monkeypatch.setattr(extractor, "_extract_transactions_optimized", extract)
+
+    with pytest.raises(ProcessingError) as excinfo:
+        extractor.extract_transactions(b"date,merchant,amount\n2025-01-03,Bembos,20.00\n", "user-1")
+
+    assert excinfo.value.message == "Uploaded file is not a PDF document"
+    extract.assert_not_called()
+
+
+def test_wrapped_pdf_header_is_accepted(monkeypatch):
+    extractor = CleanAIStatementExtractor(MagicMock())
+    transactions = [{"merchant": "Bembos"}]
+    monkeypatch.setattr(extractor, "_extract_transactions_optimized", lambda content, password: transactions)
+
+    assert extractor.extract_transactions(b"$BOP$\r\n%PDF-1.4\n...", "user-1") == transactions
+
+
+@pytest.mark.parametrize("value, expected", [
+    (12, 12.0),
+    (12.5, 12.5),
+    ("1,234.50", 1234.5),
+    (" 12.00- ", -12.0),
+    ("S/ 12.00", None),
+    ("", None),
+    (None, None),
+])
+def test_parse_amount(value, expected):
+    assert _parse_amount(value) == expected
+
+
+def test_unparseable_amount_skips_the_row(monkeypatch):
+    extractor = CleanAIStatementExtractor(MagicMock())
+    rows = [
+        {"date": "2025-01-03", "merchant": "Bembos", "amount": "20.00", "currency": "PEN"},
+        {"date": "2025-01-04", "merchant": "KFC", "amount": "S/ 35", "currency": "PEN"},
+        {"date": "2025-01-05", "merchant": "Wong", "amount": 15.5, "currency": "PEN"},
+    ]
+    extractor.client = MagicMock()
+    extractor.client.chat.completions.create.return_value.choices = [
+        MagicMock(message=MagicMock(content=json.dumps(rows)))
+    ]
+    monkeypatch.setattr(PDFService, "extract_text_from_pdf", lambda content, password: (True, "statement text", None))
+
+    transactions = extractor._extract_transactions_optimized(b"%PDF-1.4", None)
+
+    assert [(t["merchant"], t["amount"]) for t in transactions] == [("Bembos", 20.0), ("Wong", 15.5)]
+    assert transactions[0]["transaction_date"] == date(2025, 1, 3)
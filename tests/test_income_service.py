@@ -0,0 +1,82 @@
+from datetime import date, datetime
+from decimal import Decimal
+
+import pytest
+
+from app.models.card import Card
+from app.models.income import Income
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services import income_service
+from app.services.income_service import IncomeService, _advance_month
+
+
+@pytest.mark.parametrize("current, target_day, expected", [
+    (date(2025, 1, 31), 31, date(2025, 2, 28)),
+    (date(2024, 1, 31), 31, date(2024, 2, 29)),
+    (date(2025, 2, 28), 31, date(2025, 3, 31)),
+    (date(2025, 12, 15), 15, date(2026, 1, 15)),
+    (date(2025, 12, 31), 31, date(2026, 1, 31)),
+    (date(2025, 4, 30), 30, date(2025, 5, 30)),
+])
+def test_advance_month(current, target_day, expected):
+    assert _advance_month(current, target_day) == expected
+
+
+def _freeze_today(monkeypatch, today: date):
+    class FrozenDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return datetime(today.year, today.month, today.day, 9, 0, tzinfo=tz)
+
+    monkeypatch.setattr(income_service, "datetime", FrozenDatetime)
+
+
+def _income(user, card, **fields):
+    values = dict(
+        user_id=user.id,
+        card_id=card.id,
+        amount=Decimal("1500.00"),
+        currency="PEN",
+        description="Salary",
+        source="Employer",
+        income_date=date(2025, 1, 15),
+        is_recurring=True,
+        recurring_day=15,
+    )
+    values.update(fields)
+    return Income(**values)
+
+
+def test_process_recurring_incomes_only_handles_incomes_due_today(db_session, monkeypatch):
+    today = date(2025, 3, 15)
+    _freeze_today(monkeypatch, today)
+    user = User(email="income@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    card = Card(user_id=user.id, card_name="Visa")
+    db_session.add(card)
+    db_session.flush()
+
+    due_new = _income(user, card, source="Never processed")
+    due_last_month = _income(user, card, source="Processed last month", last_processed_date=date(2025, 2, 15))
+    already_today = _income(user, card, source="Processed today", last_processed_date=today)
+    other_day = _income(user, card, source="Other day", recurring_day=20)
+    one_off = _income(user, card, source="One-off", is_recurring=False)
+    db_session.add_all([due_new, due_last_month, already_today, other_day, one_off])
+    db_session.commit()
+
+    created = IncomeService(db_session).process_recurring_incomes()
+
+    assert created == 2
+    transactions = db_session.query(Transaction).all()
+    assert sorted(t.merchant for t in transactions) == ["Never processed", "Processed last month"]
+    assert all(t.transaction_date == today for t in transactions)
+    assert all(t.category == "Income" for t in transactions)
+    db_session.expire_all()
+    assert db_session.get(Income, due_new.id).last_processed_date == today
+    assert db_session.get(Income, due_last_month.id).last_processed_date == today
+    assert db_session.get(Income, other_day.id).last_processed_date is None
+
+    # A second run on the same day finds nothing left to do
+    assert IncomeService(db_session).process_recurring_incomes() == 0
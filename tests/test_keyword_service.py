@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import event
+
+from app.models.category import Category
+from app.models.user import User
+from app.schemas.category import CategoryUpdate
+from app.services import keyword_service
+from app.services.category_service import CategoryService
+from app.services.keyword_categorization_service import KeywordCategorizationService
+from app.services.keyword_service import KeywordService
+
+
+@pytest.fixture
+def keyword_user(db_session):
+    keyword_service._index_cache.clear()
+    user = User(email="keywords@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    food = Category(user_id=user.id, name="Alimentación")
+    transport = Category(user_id=user.id, name="Transporte")
+    db_session.add_all([food, transport])
+    db_session.commit()
+    service = KeywordService(db_session)
+    for category, keywords in ((food, ["bembos", "kfc", "pizza hut"]), (transport, ["uber", "grifo"])):
+        for keyword in keywords:
+            service.add_keyword(str(user.id), str(category.id), keyword)
+    return user, food, transport
+
+
+@pytest.fixture
+def count_queries(db_session):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_session.get_bind()
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_repeated_categorization_checks_freshness_once_per_instance(db_session, keyword_user, count_queries):
+    user, food, transport = keyword_user
+    user_id = str(user.id)
+    service = KeywordCategorizationService(db_session)
+    count_queries.clear()
+
+    first = service.categorize_transaction(user_id, "UBER TRIP", "")
+    queries_for_first = len(count_queries)
+    for merchant in ["BEMBOS LARCOMAR", "KFC", "GRIFO REPSOL", "Unknown shop"]:
+        service.categorize_transaction(user_id, merchant, "")
+
+    assert first.category_name == "Transporte"
+    # Fingerprint plus index build for the first call, nothing for the rest
+    assert queries_for_first == 2
+    assert len(count_queries) == 2
+
+    # A new instance (a new request) re-validates with one query and reuses the compiled index
+    other = KeywordCategorizationService(db_session)
+    assert other.categorize_transaction(user_id, "KFC MIRAFLORES", "").category_name == "Alimentación"
+    assert len(count_queries) == 3
+
+
+def test_keyword_writes_invalidate_other_instances(db_session, keyword_user):
+    user, food, transport = keyword_user
+    user_id = str(user.id)
+    categorizer = KeywordCategorizationService(db_session)
+    writer = KeywordService(db_session)
+
+    assert categorizer.categorize_transaction(user_id, "WONG", "") is None
+
+    keyword = writer.add_keyword(user_id, str(food.id), "Wong")
+    assert categorizer.categorize_transaction(user_id, "WONG", "").category_name == "Alimentación"
+
+    writer.remove_keyword(user_id, str(keyword.id))
+    assert categorizer.categorize_transaction(user_id, "WONG", "") is None
+
+
+def test_category_rename_invalidates_index(db_session, keyword_user):
+    user, food, transport = keyword_user
+    user_id = str(user.id)
+    categorizer = KeywordCategorizationService(db_session)
+    assert categorizer.categorize_transaction(user_id, "KFC", "").category_name == "Alimentación"
+
+    user.plan_tier = "pro"
+    CategoryService.update_category(db_session, user.id, user, food.id, CategoryUpdate(name="Comida"))
+
+    assert categorizer.categorize_transaction(user_id, "KFC", "").category_name == "Comida"
@@ -0,0 +1,70 @@
+import fitz  # PyMuPDF
+import pytest
+
+from app.services import pdf_service
+from app.services.pdf_service import PDFService
+
+
+def _make_pdf(page_count: int) -> bytes:
+    document = fitz.open()
+    for number in range(page_count):
+        page = document.new_page()
+        page.insert_text((72, 72), f"Page {number + 1}")
+        page.insert_text((72, 100), f"15ENE 16ENE COMPRA TIENDA {number} CONSUMO 12.50")
+    content = document.tobytes()
+    document.close()
+    return content
+
+
+@pytest.fixture
+def page_pool():
+    yield
+    pdf_service.shutdown_page_pool()
+
+
+def test_long_pdf_parallel_text_matches_sequential(monkeypatch, page_pool):
+    page_count = pdf_service._PARALLEL_PAGE_THRESHOLD + 3
+    content = _make_pdf(page_count)
+    sequential = "\n".join(pdf_service._extract_pdfium_pages(content, None, 0, page_count))
+
+    # Force the parallel path regardless of the machine's core count
+    monkeypatch.setattr(pdf_service.os, "cpu_count", lambda: pdf_service._MAX_PAGE_WORKERS)
+    parallel = PDFService._extract_text_with_pdfium(content)
+
+    assert pdf_service._page_pool is not None
+    assert parallel == sequential
+    assert "Page 1" in parallel and f"Page {page_count}" in parallel
+
+
+def test_parallel_failure_falls_back_to_sequential(monkeypatch, page_pool):
+    page_count = pdf_service._PARALLEL_PAGE_THRESHOLD
+    content = _make_pdf(page_count)
+    sequential = "\n".join(pdf_service._extract_pdfium_pages(content, None, 0, page_count))
+
+    class BrokenPool:
+        def submit(self, *args, **kwargs):
+            raise RuntimeError("pool unavailable")
+
+    monkeypatch.setattr(pdf_service.os, "cpu_count", lambda: pdf_service._MAX_PAGE_WORKERS)
+    monkeypatch.setattr(pdf_service, "_get_page_pool", lambda: BrokenPool())
+
+    assert PDFService._extract_text_with_pdfium(content) == sequential
+
+
+def test_short_pdf_stays_in_process(monkeypatch, page_pool):
+    content = _make_pdf(3)
+    opened = []
+    document_class = pdf_service.pdfium.PdfDocument
+
+    def counting_document(*args, **kwargs):
+        opened.append(args)
+        return document_class(*args, **kwargs)
+
+    monkeypatch.setattr(pdf_service.pdfium, "PdfDocument", counting_document)
+
+    text = PDFService._extract_text_with_pdfium(content)
+
+    assert pdf_service._page_pool is None
+    assert "Page 3" in text
+    # The document opened to count pages is the one the text is read from
+    assert len(opened) == 1
@@ -0,0 +1,126 @@
+import re
+import uuid
+from datetime import date
+from decimal import Decimal
+from unittest.mock import MagicMock
+
+import pytest
+
+from app.services import universal_statement_service as uss
+from app.services.universal_statement_service import UniversalStatementService, COPY_THRESHOLD
+
+_UNESCAPE = {"\\\\": "\\", "\\t": "\t", "\\n": "\n", "\\r": "\r"}
+
+
+def _parse_copy_text(payload: str):
+    """Decode COPY text format the way PostgreSQL does: \\N is NULL, backslash escapes otherwise"""
+    rows = []
+    for line in payload.split("\n")[:-1]:
+        fields = []
+        for field in line.split("\t"):
+            if field == "\\N":
+                fields.append(None)
+            else:
+                fields.append(re.sub(r"\\[\\tnr]", lambda m: _UNESCAPE[m.group(0)], field))
+        rows.append(fields)
+    return rows
+
+
+def _copy_service(dialect_name="postgresql"):
+    """Service over a mocked session whose raw cursor records the COPY call"""
+    db = MagicMock()
+    db.get_bind.return_value.dialect.name = dialect_name
+    cursor = db.connection.return_value.connection.cursor.return_value.__enter__.return_value
+    captured = {}
+
+    def copy_expert(sql, buffer):
+        captured["sql"] = sql
+        captured["payload"] = buffer.read()
+
+    cursor.copy_expert.side_effect = copy_expert
+    service = UniversalStatementService.__new__(UniversalStatementService)
+    service.db = db
+    return service, db, captured
+
+
+def _row(**overrides):
+    row = {
+        "id": uuid.uuid4(),
+        "card_id": uuid.uuid4(),
+        "statement_id": uuid.uuid4(),
+        "merchant": "Bembos",
+        "amount": Decimal("12.50"),
+        "currency": "PEN",
+        "transaction_date": date(2025, 1, 3),
+        "description": "BEMBOS LIMA",
+        "category": "Alimentación",
+        "ai_confidence": 0.95,
+    }
+    row.update(overrides)
+    return row
+
+
+def test_copy_encodes_values_and_nulls():
+    service, db, captured = _copy_service()
+    rows = [
+        _row(),
+        _row(merchant="Café Ñandú \"El Señor\", Cusco", description="", category=None),
+        _row(merchant="Tab\there", description="line one\nline two\r\\end"),
+    ]
+
+    service._copy_transactions(rows)
+
+    assert captured["sql"] == (
+        "COPY transactions (id, card_id, statement_id, merchant, amount, currency, "
+        "transaction_date, description, category, ai_confidence) FROM STDIN"
+    )
+    parsed = _parse_copy_text(captured["payload"])
+    assert len(parsed) == 3
+    expected = [[None if row[c] is None else str(row[c]) for c in uss._COPY_COLUMNS] for row in rows]
+    assert parsed == expected
+    # Empty strings stay empty strings; only None becomes NULL
+    assert parsed[1][7] == ""
+    assert parsed[1][8] is None
+    assert parsed[0][4] == "12.50"
+    assert parsed[0][6] == "2025-01-03"
+    assert parsed[1][3] == "Café Ñandú \"El Señor\", Cusco"
+
+
+def test_copy_runs_on_the_session_connection_without_committing():
+    service, db, captured = _copy_service()
+
+    service._copy_transactions([_row()])
+
+    # Same DBAPI connection as the session, so the rows commit with the statement update
+    db.connection.assert_called_once_with()
+    db.commit.assert_not_called()
+
+
+@pytest.mark.parametrize("count, uses_copy", [(COPY_THRESHOLD, False), (COPY_THRESHOLD + 1, True)])
+def test_copy_threshold(count, uses_copy):
+    service, db, captured = _copy_service()
+    card = MagicMock(id=uuid.uuid4())
+    transactions = [
+        {"merchant": "Bembos", "amount": Decimal("1.00"), "currency": "PEN", "transaction_date": date(2025, 1, 3)}
+    ] * count
+
+    rows = service._create_transactions(transactions, card, uuid.uuid4())
+
+    assert len(rows) == count
+    assert ("payload" in captured) is uses_copy
+    assert db.execute.called is not uses_copy
+    if uses_copy:
+        assert len(_parse_copy_text(captured["payload"])) == count
+
+
+def test_copy_is_postgresql_only():
+    service, db, captured = _copy_service(dialect_name="sqlite")
+    card = MagicMock(id=uuid.uuid4())
+    transactions = [
+        {"merchant": "Bembos", "amount": Decimal("1.00"), "currency": "PEN", "transaction_date": date(2025, 1, 3)}
+    ] * (COPY_THRESHOLD + 1)
+
+    service._create_transactions(transactions, card, uuid.uuid4())
+
+    assert "payload" not in captured
+    db.execute.assert_called_once()
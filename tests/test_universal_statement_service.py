@@ -0,0 +1,58 @@
+from datetime import date
+from decimal import Decimal
+
+from app.models.card import Card
+from app.models.statement import Statement
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.services.universal_statement_service import UniversalStatementService
+
+
+def _statement_with_cards(db_session):
+    user = User(email="cards@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    stale = Card(user_id=user.id, card_name="Old card")
+    selected = Card(user_id=user.id, card_name="Selected card")
+    db_session.add_all([stale, selected])
+    db_session.flush()
+    statement = Statement(
+        user_id=user.id,
+        filename="statement.pdf",
+        file_path="statement.pdf",
+        file_type="pdf",
+        status="uploaded",
+        card_id=stale.id,
+    )
+    db_session.add(statement)
+    db_session.commit()
+    return statement, stale, selected
+
+
+def _service(db_session, monkeypatch):
+    service = UniversalStatementService(db_session)
+    extracted = [
+        {"merchant": "Bembos", "amount": Decimal("20.00"), "currency": "PEN",
+         "transaction_date": date(2025, 1, 3), "description": "BEMBOS LIMA"},
+    ]
+    monkeypatch.setattr(service, "_extract_with_ai", lambda statement, content, password: list(extracted))
+    return service
+
+
+def test_transactions_use_the_card_passed_by_the_caller(db_session, monkeypatch):
+    statement, stale, selected = _statement_with_cards(db_session)
+    service = _service(db_session, monkeypatch)
+
+    # statement.card_id still points at the old card, as after a rolled-back card update
+    service.process_statement(statement.id, b"%PDF-1.4", use_keyword_categorization=False, card_id=selected.id)
+
+    assert [t.card_id for t in db_session.query(Transaction)] == [selected.id]
+
+
+def test_transactions_default_to_the_statement_card(db_session, monkeypatch):
+    statement, stale, selected = _statement_with_cards(db_session)
+    service = _service(db_session, monkeypatch)
+
+    service.process_statement(statement.id, b"%PDF-1.4", use_keyword_categorization=False)
+
+    assert [t.card_id for t in db_session.query(Transaction)] == [stale.id]